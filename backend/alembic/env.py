@@ -0,0 +1,35 @@
+# backend/alembic/env.py
+
+from logging.config import fileConfig
+
+from alembic import context
+
+import models
+from database import SQLALCHEMY_DATABASE_URL, engine
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = models.Base.metadata
+
+def run_migrations_offline():
+    """Emits the migration SQL to stdout instead of running it (`alembic upgrade head --sql`)."""
+    context.configure(url=SQLALCHEMY_DATABASE_URL, target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            # Index builds and the partitioning copy may run far longer than the API's statement timeout.
+            connection.exec_driver_sql("SET statement_timeout = 0")
+            connection.commit()
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,54 @@
+"""Initial schema: items and price_history.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases created by Base.metadata.create_all already have these tables.
+    offline = op.get_context().as_sql
+    inspector = None if offline else sa.inspect(op.get_bind())
+    if offline or not inspector.has_table("items"):
+        op.create_table(
+            "items",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String()),
+            sa.Column("serial_code", sa.String()),
+            sa.Column("store", sa.String()),
+            sa.Column("item_url", sa.String(), unique=True),
+            sa.Column("image_url", sa.String()),
+        )
+        op.create_index("ix_items_id", "items", ["id"])
+        op.create_index("ix_items_name", "items", ["name"])
+        op.create_index("ix_items_serial_code", "items", ["serial_code"], unique=True)
+        op.create_index("ix_items_store", "items", ["store"])
+    if offline or not inspector.has_table("price_history"):
+        op.create_table(
+            "price_history",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("price", sa.Float(), nullable=False),
+            sa.Column("timestamp", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("item_id", sa.Integer(), sa.ForeignKey("items.id")),
+        )
+        op.create_index("ix_price_history_id", "price_history", ["id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("price_history")
+    op.drop_table("items")
@@ -0,0 +1,47 @@
+"""Composite (item_id, timestamp DESC) index on price_history.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases created by Base.metadata.create_all already have the index, on a partitioned
+    # price_history that Postgres cannot index CONCURRENTLY.
+    concurrently = True
+    if not op.get_context().as_sql:
+        bind = op.get_bind()
+        if "ix_price_history_item_id_timestamp" in {index["name"] for index in sa.inspect(bind).get_indexes("price_history")}:
+            return
+        relkind = bind.execute(sa.text("SELECT relkind FROM pg_class WHERE oid = 'price_history'::regclass")).scalar()
+        concurrently = relkind != "p"
+    # CONCURRENTLY keeps the table writable while the index is built; it cannot run inside a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_price_history_item_id_timestamp",
+            "price_history",
+            ["item_id", sa.text("timestamp DESC")],
+            postgresql_concurrently=concurrently,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_price_history_item_id_timestamp", table_name="price_history",
+                      postgresql_concurrently=True, if_exists=True)
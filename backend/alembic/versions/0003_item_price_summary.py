@@ -0,0 +1,84 @@
+"""item_price_summary: per-item current/previous price, 30-day range and last change.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# One pass over price_history per item (served by ix_price_history_item_id_timestamp):
+# lag() marks the rows where the price changed, DISTINCT ON picks the latest row and the latest change.
+BACKFILL_SQL = """
+INSERT INTO item_price_summary
+    (item_id, current_price, previous_price, min_price_30d, max_price_30d, last_change_at, last_observed_at)
+WITH ordered AS (
+    SELECT item_id, price, timestamp,
+           lag(price) OVER (PARTITION BY item_id ORDER BY timestamp, id) AS prior_price
+    FROM price_history
+    WHERE timestamp IS NOT NULL
+),
+latest AS (
+    SELECT DISTINCT ON (item_id) item_id, price, timestamp
+    FROM ordered
+    ORDER BY item_id, timestamp DESC
+),
+last_change AS (
+    SELECT DISTINCT ON (item_id) item_id, prior_price, timestamp
+    FROM ordered
+    WHERE prior_price IS DISTINCT FROM price
+    ORDER BY item_id, timestamp DESC
+),
+recent AS (
+    SELECT item_id, min(price) AS low, max(price) AS high
+    FROM price_history
+    WHERE timestamp >= now() - interval '30 days'
+    GROUP BY item_id
+)
+SELECT latest.item_id,
+       latest.price,
+       last_change.prior_price,
+       coalesce(recent.low, latest.price),
+       coalesce(recent.high, latest.price),
+       last_change.timestamp,
+       latest.timestamp
+FROM latest
+JOIN last_change USING (item_id)
+LEFT JOIN recent USING (item_id)
+ON CONFLICT (item_id) DO NOTHING
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "item_price_summary",
+        sa.Column("item_id", sa.Integer(), sa.ForeignKey("items.id"), primary_key=True),
+        sa.Column("current_price", sa.Float(), nullable=False),
+        sa.Column("previous_price", sa.Float(), nullable=True),
+        sa.Column("min_price_30d", sa.Float(), nullable=False),
+        sa.Column("max_price_30d", sa.Float(), nullable=False),
+        sa.Column("last_change_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_observed_at", sa.DateTime(timezone=True), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_index("ix_item_price_summary_last_observed_at", "item_price_summary",
+                    ["last_observed_at"], if_not_exists=True)
+    op.execute(BACKFILL_SQL)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_item_price_summary_last_observed_at", table_name="item_price_summary", if_exists=True)
+    op.drop_table("item_price_summary", if_exists=True)
@@ -0,0 +1,37 @@
+"""last_seen_at/confirmed_count on price_history for change-only recording.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases created by Base.metadata.create_all already have these columns.
+    offline = op.get_context().as_sql
+    columns = set() if offline else {column["name"] for column in sa.inspect(op.get_bind()).get_columns("price_history")}
+    # A nullable column and a constant default are metadata-only changes: no table rewrite.
+    if "last_seen_at" not in columns:
+        op.add_column("price_history", sa.Column("last_seen_at", sa.DateTime(timezone=True), nullable=True))
+    if "confirmed_count" not in columns:
+        op.add_column("price_history",
+                      sa.Column("confirmed_count", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("price_history", "confirmed_count")
+    op.drop_column("price_history", "last_seen_at")
@@ -0,0 +1,112 @@
+"""Partition price_history by month on timestamp; add price_history_daily for retention rollups.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Postgres cannot partition a table in place: the old table is renamed, a partitioned copy takes its
+# name (keeping the id sequence), monthly partitions are created from the oldest row up to two months
+# ahead (UTC, named like partitions.partition_name), the rows are copied over and the old table dropped.
+# Written as one DO block so it also works with --sql, and skipped when create_all already partitioned it.
+PARTITION_SQL = """
+DO $$
+DECLARE
+    part_month date;
+    last_month date := (date_trunc('month', now() AT TIME ZONE 'UTC') + interval '2 months')::date;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'price_history'::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE price_history RENAME TO price_history_legacy;
+    ALTER TABLE price_history_legacy RENAME CONSTRAINT price_history_pkey TO price_history_legacy_pkey;
+    ALTER INDEX IF EXISTS ix_price_history_item_id_timestamp RENAME TO ix_price_history_legacy_item_id_timestamp;
+    ALTER INDEX IF EXISTS ix_price_history_id RENAME TO ix_price_history_legacy_id;
+
+    CREATE TABLE price_history (
+        id integer NOT NULL DEFAULT nextval('price_history_id_seq'),
+        price double precision NOT NULL,
+        timestamp timestamptz NOT NULL DEFAULT now(),
+        last_seen_at timestamptz,
+        confirmed_count integer NOT NULL DEFAULT 1,
+        item_id integer REFERENCES items (id),
+        PRIMARY KEY (id, timestamp)
+    ) PARTITION BY RANGE (timestamp);
+    ALTER SEQUENCE price_history_id_seq OWNED BY price_history.id;
+    CREATE INDEX ix_price_history_id ON price_history (id);
+    CREATE INDEX ix_price_history_item_id_timestamp ON price_history (item_id, timestamp DESC);
+    CREATE TABLE price_history_default PARTITION OF price_history DEFAULT;
+
+    SELECT date_trunc('month', coalesce(min(timestamp), now()) AT TIME ZONE 'UTC')::date
+        INTO part_month FROM price_history_legacy;
+    WHILE part_month <= last_month LOOP
+        -- Concatenation rather than format(): percent signs would be doubled in --sql output.
+        EXECUTE 'CREATE TABLE ' || quote_ident('price_history_p' || to_char(part_month, 'YYYY_MM'))
+            || ' PARTITION OF price_history FOR VALUES FROM ('
+            || quote_literal(to_char(part_month, 'YYYY-MM-DD') || ' 00:00:00+00') || ') TO ('
+            || quote_literal(to_char(part_month + interval '1 month', 'YYYY-MM-DD') || ' 00:00:00+00') || ')';
+        part_month := (part_month + interval '1 month')::date;
+    END LOOP;
+
+    INSERT INTO price_history (id, price, timestamp, last_seen_at, confirmed_count, item_id)
+    SELECT id, price, coalesce(timestamp, now()), last_seen_at, confirmed_count, item_id
+    FROM price_history_legacy;
+    DROP TABLE price_history_legacy;
+END $$;
+"""
+
+UNPARTITION_SQL = """
+ALTER TABLE price_history RENAME TO price_history_partitioned;
+ALTER TABLE price_history_partitioned RENAME CONSTRAINT price_history_pkey TO price_history_partitioned_pkey;
+ALTER INDEX ix_price_history_item_id_timestamp RENAME TO ix_price_history_partitioned_item_id_timestamp;
+ALTER INDEX ix_price_history_id RENAME TO ix_price_history_partitioned_id;
+CREATE TABLE price_history (
+    id integer PRIMARY KEY DEFAULT nextval('price_history_id_seq'),
+    price double precision NOT NULL,
+    timestamp timestamptz DEFAULT now(),
+    last_seen_at timestamptz,
+    confirmed_count integer NOT NULL DEFAULT 1,
+    item_id integer REFERENCES items (id)
+);
+ALTER SEQUENCE price_history_id_seq OWNED BY price_history.id;
+CREATE INDEX ix_price_history_id ON price_history (id);
+CREATE INDEX ix_price_history_item_id_timestamp ON price_history (item_id, timestamp DESC);
+INSERT INTO price_history SELECT id, price, timestamp, last_seen_at, confirmed_count, item_id FROM price_history_partitioned;
+DROP TABLE price_history_partitioned;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(PARTITION_SQL)
+    op.create_table(
+        "price_history_daily",
+        sa.Column("item_id", sa.Integer(), sa.ForeignKey("items.id"), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("min_price", sa.Float(), nullable=False),
+        sa.Column("max_price", sa.Float(), nullable=False),
+        sa.Column("close_price", sa.Float(), nullable=False),
+        sa.Column("observations", sa.Integer(), nullable=False),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Rows already rolled up by retention stay aggregated; only the raw rows still present come back.
+    op.drop_table("price_history_daily", if_exists=True)
+    op.execute(UNPARTITION_SQL)
@@ -0,0 +1,142 @@
+# backend/async_api.py
+
+"""Async versions of the item and price routes, served when DB_MODE=async.
+
+main.py registers this router before its own routes, so these take precedence over the sync
+routes with the same path and method. The queries themselves are the ones in crud.py, run on
+the asyncpg connection through AsyncSession.run_sync, so both modes behave identically.
+What crud.py would do outside that connection (partition DDL on the sync engine, the Redis
+item cache) is done here in the threadpool instead, so it never blocks the event loop.
+"""
+
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+import models
+import partitions
+import schemas
+from cache import ITEM_CACHE, MISSING
+from database import create_async_session_factory
+from limits import DEFAULT_PAGE_SIZE, MAX_BULK_ITEMS, MAX_PAGE_SIZE, MAX_PRICE_BATCH
+
+async_engine, AsyncSessionLocal = create_async_session_factory()
+
+router = APIRouter()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def _cache_call(method, *args):
+    # The Redis client blocks on the network; the in-process LRU does not need a thread.
+    if ITEM_CACHE.backend == "redis":
+        return await run_in_threadpool(method, *args)
+    return method(*args)
+
+async def _ensure_partitions(timestamps=()):
+    # Creating a partition goes through the sync engine; once every month is known this is a no-op.
+    await run_in_threadpool(partitions.ensure_partitions, list(timestamps))
+
+async def _get_item_by_serial_code(db: AsyncSession, serial_code: str) -> Optional[schemas.Item]:
+    """crud.get_item_by_serial_code with the cache calls kept off the event loop."""
+    cached = await _cache_call(ITEM_CACHE.get, serial_code)
+    if cached is MISSING:
+        return None
+    if cached is not None:
+        return schemas.Item(**cached)
+    item = await db.run_sync(crud.find_item_by_serial_code, serial_code)
+    await _cache_call(ITEM_CACHE.set, serial_code, MISSING if item is None else item.model_dump())
+    return item
+
+@router.post("/items/{item_id}/prices/", response_model=schemas.PriceHistoryCreate)
+async def create_price_for_item(item_id: int, price: schemas.PriceHistoryCreate, dedupe: bool = False,
+                                db: AsyncSession = Depends(get_async_db)):
+    await _ensure_partitions()
+    await db.run_sync(crud.create_price, item_id, price.price, dedupe)
+    return price
+
+@router.get("/items/{item_id}/prices", response_model=List[schemas.PricePoint])
+async def read_price_history(item_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                             bucket: Optional[Literal["hour", "day", "week", "month"]] = None,
+                             limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                             db: AsyncSession = Depends(get_async_db)):
+    if await db.get(models.Item, item_id) is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return await db.run_sync(crud.get_price_history, item_id, start, end, bucket, limit)
+
+@router.get("/items/{item_id}/prices/daily", response_model=List[schemas.PricePoint])
+async def read_daily_prices(item_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                            limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                            db: AsyncSession = Depends(get_async_db)):
+    if await db.get(models.Item, item_id) is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return await db.run_sync(crud.get_daily_prices, item_id, start, end, limit)
+
+@router.get("/items/{item_id}/price/latest", response_model=schemas.PriceHistory)
+async def read_latest_price(item_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_price = await db.run_sync(crud.get_latest_price, item_id)
+    if db_price is None:
+        raise HTTPException(status_code=404, detail="No price recorded for this item")
+    return db_price
+
+@router.get("/items/{item_id}/price/summary", response_model=schemas.PriceSummary)
+async def read_price_summary(item_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_summary = await db.get(models.ItemPriceSummary, item_id)
+    if db_summary is None:
+        raise HTTPException(status_code=404, detail="No price recorded for this item")
+    return db_summary
+
+@router.get("/prices/summary", response_model=List[schemas.PriceSummary])
+async def read_price_summaries(response: Response, after: int = 0,
+                               limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                               db: AsyncSession = Depends(get_async_db)):
+    summaries = await db.run_sync(crud.get_price_summaries, after, limit)
+    if len(summaries) == limit:
+        response.headers["X-Next-After"] = str(summaries[-1].item_id)
+    return summaries
+
+@router.post("/prices/batch", response_model=schemas.PriceBatchResult)
+async def create_prices_batch(observations: List[schemas.PriceObservation], dedupe: bool = False,
+                              db: AsyncSession = Depends(get_async_db)):
+    if len(observations) > MAX_PRICE_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_PRICE_BATCH} prices per request")
+    await _ensure_partitions(obs.observed_at for obs in observations if obs.observed_at is not None)
+    return await db.run_sync(crud.insert_price_batch, observations, dedupe)
+
+@router.get("/items/by_serial_code/{serial_code}", response_model=schemas.Item)
+async def read_item_by_serial_code(serial_code: str, db: AsyncSession = Depends(get_async_db)):
+    db_item = await _get_item_by_serial_code(db, serial_code)
+    if db_item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return db_item
+
+@router.get("/items/", response_model=List[schemas.Item])
+async def read_items(response: Response, after: int = 0, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                     db: AsyncSession = Depends(get_async_db)):
+    items = await db.run_sync(crud.get_items_page, after, limit)
+    if len(items) == limit:
+        response.headers["X-Next-After"] = str(items[-1].id)
+    return items
+
+@router.post("/items/", response_model=schemas.Item)
+async def create_item(item: schemas.ItemCreate, db: AsyncSession = Depends(get_async_db)):
+    if await _get_item_by_serial_code(db, item.serial_code):
+        raise HTTPException(status_code=400, detail="Serial code already registered")
+    db_item = await db.run_sync(crud.create_item, item, False)
+    await _cache_call(ITEM_CACHE.invalidate, [item.serial_code])
+    if db_item is None:
+        raise HTTPException(status_code=400, detail="Serial code already registered")
+    return db_item
+
+@router.post("/items/bulk", response_model=List[schemas.ItemBulkResult])
+async def create_items_bulk(items: List[schemas.ItemCreate], db: AsyncSession = Depends(get_async_db)):
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ITEMS} items per request")
+    results = await db.run_sync(crud.bulk_upsert_items, items, False)
+    await _cache_call(ITEM_CACHE.invalidate, [result.serial_code for result in results if result.status == "created"])
+    return results
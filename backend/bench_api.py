@@ -0,0 +1,131 @@
+# backend/bench_api.py
+
+"""Load test comparing the API in DB_MODE=sync and DB_MODE=async.
+
+Starts the API under uvicorn once per mode and fires concurrent requests at the routes the
+scrapers hit hardest (serial code lookups, latest price, summaries; price posts with --write):
+
+    python bench_api.py --concurrency 500 --requests 20000
+    python bench_api.py --modes async --write
+
+Needs a migrated database with some items in it. --write posts each item's current price with
+dedupe=true, which only confirms existing rows, but it still writes to that database.
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def start_server(mode: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ, DB_MODE=mode)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+def wait_until_up(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"API at {base_url} did not come up within {timeout:.0f}s")
+
+def build_targets(base_url: str, sample_size: int, write: bool) -> list:
+    """(method, path, json body) requests built from the first items in the database."""
+    items = httpx.get(f"{base_url}/items/", params={"limit": sample_size}, timeout=30).json()
+    if not items:
+        raise RuntimeError("The database has no items to benchmark against.")
+    targets = []
+    for item in items:
+        targets.append(("GET", f"/items/by_serial_code/{item['serial_code']}", None))
+        targets.append(("GET", f"/items/{item['id']}/price/latest", None))
+        targets.append(("GET", f"/items/{item['id']}/price/summary", None))
+    if write:
+        summaries = httpx.get(f"{base_url}/prices/summary", params={"limit": sample_size}, timeout=30).json()
+        for summary in summaries:
+            body = {"price": summary["current_price"]}
+            targets.append(("POST", f"/items/{summary['item_id']}/prices/?dedupe=true", body))
+    return targets
+
+async def run_load(base_url: str, targets: list, concurrency: int, total: int) -> dict:
+    latencies, errors = [], 0
+    issued = itertools.count()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            while next(issued) < total:
+                method, path, body = random.choice(targets)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body)
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                # 404s are expected for items without prices; anything 5xx means the server gave up.
+                if response.status_code >= 500:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0.0
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares API throughput in sync and async database mode.")
+    parser.add_argument("--modes", nargs="+", choices=["sync", "async"], default=["sync", "async"])
+    parser.add_argument("--concurrency", type=int, default=200, help="Requests in flight at once.")
+    parser.add_argument("--requests", type=int, default=10000, help="Requests per mode.")
+    parser.add_argument("--sample-items", type=int, default=200, help="How many items the requests are spread over.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--write", action="store_true", help="Also post (deduplicated) prices.")
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = {}
+    for mode in args.modes:
+        server = start_server(mode, args.port)
+        try:
+            wait_until_up(base_url)
+            targets = build_targets(base_url, args.sample_items, args.write)
+            # A short warm-up so both modes start with an open connection pool.
+            asyncio.run(run_load(base_url, targets, min(args.concurrency, 20), 200))
+            results[mode] = asyncio.run(run_load(base_url, targets, args.concurrency, args.requests))
+            pools = httpx.get(f"{base_url}/metrics", timeout=10).json()
+            pools = [pools["pool"]] + ([pools["async_pool"]] if "async_pool" in pools else [])
+            results[mode]["pool_wait_max_ms"] = max(p["wait_seconds_max"] for p in pools) * 1000
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"{'mode':<6} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'pool wait max ms':>17}")
+    for mode, r in results.items():
+        print(f"{mode:<6} {r['requests']:>9} {r['errors']:>7} {r['rps']:>9.1f} {r['p50_ms']:>8.1f} "
+              f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['pool_wait_max_ms']:>17.1f}")
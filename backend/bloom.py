@@ -0,0 +1,54 @@
+# backend/bloom.py
+
+"""Bloom filter snapshots of the known serial codes / item URLs, downloaded by the scrapers.
+
+The category crawler and `koton_scraper.py --skip-known-urls` check product URLs against the
+snapshot locally instead of asking the API. The wire format (header + bit array) is shared with
+scraper/bloom.py; `python bloom.py` in the scraper directory checks that the two agree.
+"""
+
+import hashlib
+import math
+import struct
+
+class BloomFilter:
+    """Bloom filter over strings, using double hashing of a single 128-bit BLAKE2b digest."""
+
+    # Magic, number of bits, number of hash functions.
+    HEADER = struct.Struct(">4sQI")
+    MAGIC = b"BLM1"
+
+    def __init__(self, size_bits: int, hash_count: int, bits: bytes = None):
+        self.size_bits = size_bits
+        self.hash_count = hash_count
+        self.bits = bytearray((size_bits + 7) // 8) if bits is None else bytearray(bits)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float) -> "BloomFilter":
+        """Sized so `capacity` entries give roughly `error_rate` false positives."""
+        capacity = max(1, capacity)
+        size_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        return cls(size_bits, max(1, round(size_bits / capacity * math.log(2))))
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.size_bits for i in range(self.hash_count))
+
+    def add(self, value: str):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    def to_bytes(self) -> bytes:
+        return self.HEADER.pack(self.MAGIC, self.size_bits, self.hash_count) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BloomFilter":
+        magic, size_bits, hash_count = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC:
+            raise ValueError("Not a Bloom filter snapshot")
+        return cls(size_bits, hash_count, data[cls.HEADER.size:])
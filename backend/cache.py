@@ -0,0 +1,152 @@
+# backend/cache.py
+
+"""Read-through cache for serial_code -> item lookups.
+
+Items never change once created, so a cached item only goes away through LRU eviction or its TTL.
+Unknown serial codes are cached too ("negative" entries, with a short TTL) because most scraper
+lookups are for items that either exist or are about to be created; creating an item invalidates
+its entry. Set CACHE_REDIS_URL to share the cache between API workers through Redis (needs the
+`redis` package); otherwise every process keeps its own in-memory LRU.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+ITEM_CACHE_SIZE = int(os.getenv("ITEM_CACHE_SIZE", "100000"))
+ITEM_CACHE_TTL = float(os.getenv("ITEM_CACHE_TTL", "3600"))
+# Kept short: another API worker may create the item without this process hearing about it.
+ITEM_CACHE_NEGATIVE_TTL = float(os.getenv("ITEM_CACHE_NEGATIVE_TTL", "30"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+
+# Returned by get() for a cached "no such item".
+MISSING = object()
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def count(self, field: str, amount: int = 1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                # Share of lookups that never reached Postgres.
+                "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+class LRUCache:
+    """Thread-safe in-process LRU with a per-entry TTL."""
+
+    backend = "memory"
+
+    def __init__(self, maxsize: int = ITEM_CACHE_SIZE, ttl: float = ITEM_CACHE_TTL,
+                 negative_ttl: float = ITEM_CACHE_NEGATIVE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """The cached value, MISSING for a cached miss, or None when the key is not cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            self.stats.count("misses")
+            return None
+        self.stats.count("negative_hits" if entry[0] is MISSING else "hits")
+        return entry[0]
+
+    def set(self, key: str, value):
+        """Caches `value` (a JSON-serializable dict), or MISSING for a key that has no item."""
+        ttl = self.negative_ttl if value is MISSING else self.ttl
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, keys):
+        keys = list(keys)
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        self.stats.count("invalidations", len(keys))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        return {"backend": self.backend, "size": size, **self.stats.snapshot()}
+
+class RedisCache(LRUCache):
+    """Same interface on top of Redis, so every API worker sees the same entries and invalidations."""
+
+    backend = "redis"
+    # Stored in Redis for a cached miss.
+    MISSING_MARKER = "-"
+
+    def __init__(self, url: str, prefix: str = "item:serial:", **kwargs):
+        super().__init__(**kwargs)
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            self.stats.count("misses")
+            return None
+        if raw.decode() == self.MISSING_MARKER:
+            self.stats.count("negative_hits")
+            return MISSING
+        self.stats.count("hits")
+        return json.loads(raw)
+
+    def set(self, key: str, value):
+        if value is MISSING:
+            self.client.set(self.prefix + key, self.MISSING_MARKER, ex=max(1, int(self.negative_ttl)))
+        else:
+            self.client.set(self.prefix + key, json.dumps(value), ex=max(1, int(self.ttl)))
+
+    def invalidate(self, keys):
+        keys = [self.prefix + key for key in keys]
+        if keys:
+            self.client.delete(*keys)
+        self.stats.count("invalidations", len(keys))
+
+    def snapshot(self) -> dict:
+        return {"backend": self.backend, **self.stats.snapshot()}
+
+def create_item_cache() -> LRUCache:
+    if CACHE_REDIS_URL:
+        if redis is None:
+            raise RuntimeError("CACHE_REDIS_URL is set but the 'redis' package is not installed")
+        return RedisCache(CACHE_REDIS_URL)
+    return LRUCache()
+
+# serial_code -> item (schemas.Item as a dict).
+ITEM_CACHE = create_item_cache()
@@ -0,0 +1,421 @@
+# backend/crud.py
+
+import json
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional
+
+from sqlalchemy import bindparam, func, insert, literal_column, select, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+import partitions
+import schemas
+from bloom import BloomFilter
+from cache import ITEM_CACHE, MISSING
+from database import SessionLocal
+
+# Rows fetched per round trip from the server-side cursor when streaming.
+STREAM_CHUNK_SIZE = 1000
+# Bucket sizes accepted for downsampled price history (Postgres date_trunc units).
+PRICE_BUCKETS = ("hour", "day", "week", "month")
+# Window of the min/max columns in item_price_summary.
+SUMMARY_WINDOW = timedelta(days=30)
+
+def get_item_by_serial_code(db: Session, serial_code: str) -> Optional[schemas.Item]:
+    """Looks an item up through ITEM_CACHE; only cache misses reach the database."""
+    cached = ITEM_CACHE.get(serial_code)
+    if cached is MISSING:
+        return None
+    if cached is not None:
+        return schemas.Item(**cached)
+    item = find_item_by_serial_code(db, serial_code)
+    ITEM_CACHE.set(serial_code, MISSING if item is None else item.model_dump())
+    return item
+
+def find_item_by_serial_code(db: Session, serial_code: str) -> Optional[schemas.Item]:
+    """Database half of get_item_by_serial_code, for callers that consult ITEM_CACHE themselves."""
+    db_item = db.query(models.Item).filter(models.Item.serial_code == serial_code).first()
+    return None if db_item is None else schemas.Item.model_validate(db_item)
+
+def create_item(db: Session, item: schemas.ItemCreate, invalidate_cache: bool = True) -> Optional[models.Item]:
+    """Inserts an item; returns None if its serial code or URL is already taken.
+
+    Without `invalidate_cache` the caller must drop the serial code from ITEM_CACHE itself.
+    """
+    db_item = models.Item(**item.dict())
+    db.add(db_item)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Raced with another writer, or a cached "not found" was out of date.
+        db.rollback()
+        return None
+    finally:
+        if invalidate_cache:
+            ITEM_CACHE.invalidate([item.serial_code])
+    db.refresh(db_item)
+    return db_item
+
+def create_price(db: Session, item_id: int, price: float, dedupe: bool = False):
+    """Records a single price for an item and updates its summary, in one transaction."""
+    if dedupe:
+        # Change-only recording: an unchanged price just confirms the item's latest row.
+        record_prices(db, [{"item_id": item_id, "price": price, "timestamp": datetime.now(timezone.utc)}], dedupe=True)
+    else:
+        partitions.ensure_partitions()
+        db_price = models.PriceHistory(price=price, item_id=item_id)
+        db.add(db_price)
+        db.flush()
+        db.refresh(db_price)
+        update_price_summaries(db, [{"item_id": item_id, "price": db_price.price, "timestamp": db_price.timestamp}])
+    db.commit()
+
+def bulk_upsert_items(db: Session, items: List[schemas.ItemCreate],
+                      invalidate_cache: bool = True) -> List[schemas.ItemBulkResult]:
+    """Inserts a batch of items in one transaction, skipping ones that already exist.
+
+    Conflicts are resolved by Postgres (INSERT ... ON CONFLICT DO NOTHING), so the
+    whole batch costs one INSERT plus one SELECT for the rows that already existed.
+    Without `invalidate_cache` the caller must drop the created serial codes from ITEM_CACHE.
+    """
+    # Keep the first payload for each serial code; later duplicates in the same batch report the same status.
+    unique_items = {}
+    for item in items:
+        unique_items.setdefault(item.serial_code, item)
+
+    created_ids = {}
+    if unique_items:
+        stmt = (
+            pg_insert(models.Item)
+            .values([item.dict() for item in unique_items.values()])
+            .on_conflict_do_nothing()
+            .returning(models.Item.id, models.Item.serial_code)
+        )
+        created_ids = {serial_code: item_id for item_id, serial_code in db.execute(stmt)}
+
+    missing = [code for code in unique_items if code not in created_ids]
+    existing_ids = {}
+    if missing:
+        rows = db.query(models.Item.id, models.Item.serial_code).filter(models.Item.serial_code.in_(missing))
+        existing_ids = {serial_code: item_id for item_id, serial_code in rows}
+    db.commit()
+    # Drop cached "not found" entries for the new serial codes only once they are visible to other sessions;
+    # a lookup before the commit would cache "not found" again.
+    if invalidate_cache:
+        ITEM_CACHE.invalidate(created_ids)
+
+    results = []
+    for item in items:
+        code = item.serial_code
+        if code in created_ids:
+            results.append(schemas.ItemBulkResult(serial_code=code, id=created_ids[code], status="created"))
+        elif code in existing_ids:
+            results.append(schemas.ItemBulkResult(serial_code=code, id=existing_ids[code], status="existing"))
+        else:
+            # The serial code is new but another unique column (item_url) already belongs to a different item.
+            results.append(schemas.ItemBulkResult(serial_code=code, id=None, status="conflict"))
+    return results
+
+def insert_price_batch(db: Session, observations: List[schemas.PriceObservation],
+                       dedupe: bool = False) -> schemas.PriceBatchResult:
+    """Writes a batch of price observations with a single multi-row INSERT and one commit.
+
+    Rows that reference an unknown item or carry an invalid price are reported back
+    instead of failing the whole batch. With `dedupe`, unchanged prices only confirm the latest row.
+    """
+    requested_ids = {obs.item_id for obs in observations}
+    known_ids = set()
+    if requested_ids:
+        rows = db.query(models.Item.id).filter(models.Item.id.in_(requested_ids))
+        known_ids = {item_id for (item_id,) in rows}
+
+    now = datetime.now(timezone.utc)
+    rows, errors = [], []
+    for index, obs in enumerate(observations):
+        if obs.item_id not in known_ids:
+            errors.append(schemas.PriceBatchError(index=index, item_id=obs.item_id, detail="Item not found"))
+        elif not math.isfinite(obs.price) or obs.price <= 0:
+            errors.append(schemas.PriceBatchError(index=index, item_id=obs.item_id, detail="Invalid price"))
+        else:
+            rows.append({"item_id": obs.item_id, "price": obs.price, "timestamp": _as_utc(obs.observed_at) or now})
+
+    confirmed = 0
+    if rows:
+        confirmed = record_prices(db, rows, dedupe=dedupe)
+        db.commit()
+    return schemas.PriceBatchResult(inserted=len(rows) - confirmed, confirmed=confirmed, errors=errors)
+
+def record_prices(db: Session, rows: List[dict], dedupe: bool = False) -> int:
+    """Writes validated price rows and their summary updates, inside the caller's transaction.
+
+    With `dedupe`, a row whose price equals the item's current price is not inserted; it bumps
+    last_seen_at/confirmed_count of the latest row instead. Returns how many rows were folded that way.
+    """
+    partitions.ensure_partitions(row["timestamp"] for row in rows)
+    new_rows, confirmations = _split_unchanged_prices(db, rows) if dedupe else (rows, {})
+    # Confirm before inserting, while each item's newest row is still the one being repeated.
+    if confirmations:
+        _confirm_latest_prices(db, confirmations)
+    if new_rows:
+        db.execute(insert(models.PriceHistory).values(new_rows))
+    update_price_summaries(db, rows)
+    return len(rows) - len(new_rows)
+
+def _split_unchanged_prices(db: Session, rows: List[dict]):
+    """Separates price changes from repeats of the current price, using item_price_summary.
+
+    Repeats of a row stored earlier are returned per item as (count, last seen); repeats of a
+    change within the same batch are folded into that new row directly. An item whose newest
+    stored row does not hold the current price (e.g. it was removed) gets a new row instead.
+    """
+    summary, ph = models.ItemPriceSummary, models.PriceHistory
+    latest_price = (
+        select(ph.price)
+        .where(ph.item_id == summary.item_id)
+        .order_by(ph.timestamp.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    current = {
+        item_id: (price, _as_utc(observed_at), None)
+        for item_id, price, observed_at, stored_price in db.execute(
+            select(summary.item_id, summary.current_price, summary.last_observed_at, latest_price)
+            .where(summary.item_id.in_({row["item_id"] for row in rows}))
+            .with_for_update(of=summary)
+        )
+        if stored_price == price
+    }
+    new_rows, confirmations = [], {}
+    for row in sorted(rows, key=lambda r: r["timestamp"]):
+        price, observed_at, new_row = current.get(row["item_id"], (None, None, None))
+        if observed_at is not None and row["timestamp"] >= observed_at and row["price"] == price:
+            if new_row is not None:
+                new_row["confirmed_count"] += 1
+                new_row["last_seen_at"] = row["timestamp"]
+            else:
+                count, _ = confirmations.get(row["item_id"], (0, None))
+                confirmations[row["item_id"]] = (count + 1, row["timestamp"])
+            continue
+        # Late (out-of-order) observations are always kept, as they cannot be checked against the current price.
+        new_row = dict(row, confirmed_count=1, last_seen_at=None)
+        new_rows.append(new_row)
+        if observed_at is None or row["timestamp"] >= observed_at:
+            current[row["item_id"]] = (row["price"], row["timestamp"], new_row)
+    return new_rows, confirmations
+
+def _confirm_latest_prices(db: Session, confirmations: dict):
+    """Bumps last_seen_at/confirmed_count of each item's newest price row (one executemany UPDATE)."""
+    table = models.PriceHistory.__table__
+    latest = table.alias("latest")
+    latest_id = (
+        select(latest.c.id)
+        .where(latest.c.item_id == bindparam("b_item_id"))
+        .order_by(latest.c.timestamp.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(table)
+        .where(table.c.id == latest_id)
+        .values(last_seen_at=bindparam("b_seen_at"), confirmed_count=table.c.confirmed_count + bindparam("b_count"))
+    )
+    db.connection().execute(stmt, [
+        {"b_item_id": item_id, "b_seen_at": seen_at, "b_count": count}
+        for item_id, (count, seen_at) in confirmations.items()
+    ])
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Treats naive timestamps from scrapers as UTC so they compare with the database's aware ones."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+def update_price_summaries(db: Session, rows: List[dict]):
+    """Folds newly inserted price rows into item_price_summary, inside the caller's transaction.
+
+    Current/previous price and change times are updated incrementally; the 30-day min/max are
+    re-read for the touched items only, through the (item_id, timestamp) index.
+    """
+    summary = models.ItemPriceSummary
+    item_ids = {row["item_id"] for row in rows}
+    existing = {
+        s.item_id: s
+        for s in db.query(summary).filter(summary.item_id.in_(item_ids)).with_for_update()
+    }
+
+    state = {}
+    for item_id, s in existing.items():
+        state[item_id] = {
+            "current_price": s.current_price, "previous_price": s.previous_price,
+            "last_change_at": s.last_change_at, "last_observed_at": _as_utc(s.last_observed_at),
+        }
+    for row in sorted(rows, key=lambda r: r["timestamp"]):
+        current = state.get(row["item_id"])
+        if current is None:
+            state[row["item_id"]] = {
+                "current_price": row["price"], "previous_price": None,
+                "last_change_at": row["timestamp"], "last_observed_at": row["timestamp"],
+            }
+        elif row["timestamp"] >= current["last_observed_at"]:
+            # Late (out-of-order) observations only count towards the min/max below.
+            if row["price"] != current["current_price"]:
+                current["previous_price"] = current["current_price"]
+                current["current_price"] = row["price"]
+                current["last_change_at"] = row["timestamp"]
+            current["last_observed_at"] = row["timestamp"]
+
+    ph = models.PriceHistory
+    window = db.execute(
+        select(ph.item_id, func.min(ph.price), func.max(ph.price))
+        .where(ph.item_id.in_(item_ids), ph.timestamp >= datetime.now(timezone.utc) - SUMMARY_WINDOW)
+        .group_by(ph.item_id)
+    ).all()
+    min_max = {item_id: (low, high) for item_id, low, high in window}
+
+    values = []
+    for item_id, current in state.items():
+        low, high = min_max.get(item_id, (current["current_price"], current["current_price"]))
+        values.append({"item_id": item_id, "min_price_30d": low, "max_price_30d": high, **current})
+    stmt = pg_insert(summary).values(values)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[summary.item_id],
+        set_={column: stmt.excluded[column] for column in values[0] if column != "item_id"},
+    ))
+
+def get_price_summaries(db: Session, after: int = 0, limit: int = 1000) -> List[models.ItemPriceSummary]:
+    """Keyset page of item_price_summary, ordered by item_id."""
+    return (
+        db.query(models.ItemPriceSummary)
+        .filter(models.ItemPriceSummary.item_id > after)
+        .order_by(models.ItemPriceSummary.item_id)
+        .limit(limit)
+        .all()
+    )
+
+def get_items_page(db: Session, after: int = 0, limit: int = 1000) -> List[models.Item]:
+    """Returns up to `limit` items with an id greater than `after`, in id order (keyset pagination)."""
+    return (
+        db.query(models.Item)
+        .filter(models.Item.id > after)
+        .order_by(models.Item.id)
+        .limit(limit)
+        .all()
+    )
+
+def stream_items_ndjson(after: int = 0) -> Iterator[str]:
+    """Yields every item as one JSON line, reading through a server-side cursor in fixed-size chunks.
+
+    The generator owns its session because it keeps running after the request handler has returned.
+    """
+    columns = [models.Item.id, models.Item.name, models.Item.serial_code, models.Item.store,
+               models.Item.item_url, models.Item.image_url]
+    db = SessionLocal()
+    try:
+        stmt = (
+            select(*columns)
+            .where(models.Item.id > after)
+            .order_by(models.Item.id)
+            .execution_options(yield_per=STREAM_CHUNK_SIZE)
+        )
+        for partition in db.execute(stmt).partitions():
+            yield "".join(json.dumps(dict(row._mapping), ensure_ascii=False) + "\n" for row in partition)
+    finally:
+        db.close()
+
+# Item columns a Bloom filter snapshot can be built over.
+KNOWN_FILTER_FIELDS = ("serial_code", "item_url")
+# False positive rates a snapshot can be built for; a fixed set keeps _known_filters bounded.
+KNOWN_FILTER_ERROR_RATES = (0.01, 0.001, 0.0001, 0.00001)
+# Built snapshots by (field, error rate), reused until the items table changes size.
+_known_filters = {}
+
+def get_known_filter(db: Session, field: str, error_rate: float) -> BloomFilter:
+    """Bloom filter of every item's `field`, with headroom for scrapers to add the items they save."""
+    if field not in KNOWN_FILTER_FIELDS:
+        raise ValueError(f"Unsupported field: {field}")
+    if error_rate not in KNOWN_FILTER_ERROR_RATES:
+        raise ValueError(f"Unsupported error rate: {error_rate}")
+    # Items are only ever inserted, so (count, max id) identifies the snapshot contents.
+    version = tuple(db.query(func.count(models.Item.id), func.max(models.Item.id)).one())
+    cached = _known_filters.get((field, error_rate))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    known = BloomFilter.for_capacity(int(version[0] * 1.1) + 1000, error_rate)
+    stmt = select(getattr(models.Item, field)).execution_options(yield_per=STREAM_CHUNK_SIZE)
+    for partition in db.execute(stmt).scalars().partitions():
+        for value in partition:
+            if value:
+                known.add(value)
+    _known_filters[(field, error_rate)] = (version, known)
+    return known
+
+def get_latest_price(db: Session, item_id: int) -> Optional[models.PriceHistory]:
+    """Newest price row of an item; a single probe of the (item_id, timestamp DESC) index."""
+    return (
+        db.query(models.PriceHistory)
+        .filter(models.PriceHistory.item_id == item_id)
+        .order_by(models.PriceHistory.timestamp.desc())
+        .first()
+    )
+
+def get_daily_prices(db: Session, item_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     limit: int = 1000) -> List[schemas.PricePoint]:
+    """Daily rollups of an item's history from before the retention window, oldest first."""
+    daily = models.PriceHistoryDaily
+    conditions = [daily.item_id == item_id]
+    if start is not None:
+        conditions.append(daily.day >= start.date())
+    if end is not None:
+        conditions.append(daily.day < end.date())
+    rows = db.query(daily).filter(*conditions).order_by(daily.day.desc()).limit(limit).all()
+    return [
+        schemas.PricePoint(
+            timestamp=datetime.combine(row.day, datetime.min.time(), tzinfo=timezone.utc), price=row.close_price,
+            min_price=row.min_price, max_price=row.max_price, count=row.observations,
+        )
+        for row in reversed(rows)
+    ]
+
+def get_price_history(db: Session, item_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                      bucket: Optional[str] = None, limit: int = 1000) -> List[schemas.PricePoint]:
+    """Price history of an item in [start, end), oldest first, optionally downsampled into time buckets."""
+    ph = models.PriceHistory
+    conditions = [ph.item_id == item_id]
+    if start is not None:
+        conditions.append(ph.timestamp >= start)
+    if end is not None:
+        conditions.append(ph.timestamp < end)
+
+    if bucket is None:
+        # Take the newest `limit` rows through the index, then return them oldest first.
+        rows = db.execute(
+            select(ph.timestamp, ph.price, ph.last_seen_at, ph.confirmed_count)
+            .where(*conditions).order_by(ph.timestamp.desc()).limit(limit)
+        ).all()
+        return [
+            schemas.PricePoint(timestamp=ts, price=price, min_price=price, max_price=price, count=count, last_seen_at=seen_at)
+            for ts, price, seen_at, count in reversed(rows)
+        ]
+
+    if bucket not in PRICE_BUCKETS:
+        raise ValueError(f"Unsupported bucket: {bucket}")
+    # Inlined (it is whitelisted above) so Postgres sees the same expression in SELECT and GROUP BY.
+    bucket_start = func.date_trunc(literal_column(f"'{bucket}'"), ph.timestamp).label("bucket_start")
+    # The bucket's closing price is the price of its newest row.
+    close_price = func.array_agg(aggregate_order_by(ph.price, ph.timestamp.desc()))[1]
+    rows = db.execute(
+        # Deduplicated rows stand for confirmed_count observations each.
+        select(bucket_start, close_price, func.min(ph.price), func.max(ph.price), func.sum(ph.confirmed_count))
+        .where(*conditions)
+        .group_by(bucket_start)
+        .order_by(bucket_start.desc())
+        .limit(limit)
+    ).all()
+    return [
+        schemas.PricePoint(timestamp=ts, price=close, min_price=low, max_price=high, count=count)
+        for ts, close, low, high, count in reversed(rows)
+    ]
@@ -0,0 +1,165 @@
+# backend/export.py
+
+"""Streams items joined with their price history as Parquet, Arrow IPC or gzipped CSV.
+
+Rows are read through a server-side cursor and encoded chunk by chunk, so memory stays bounded
+no matter how long the history is. Served by GET /export/prices, or run directly:
+
+    python export.py --format parquet --output prices.parquet --start 2026-01-01
+"""
+
+import argparse
+import csv
+import io
+import zlib
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+
+import models
+from database import SessionLocal
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Rows per cursor round trip; also one Parquet row group / Arrow record batch.
+EXPORT_CHUNK_SIZE = 50000
+
+EXPORT_FORMATS = {
+    # format: (media type, file extension, needs pyarrow)
+    "parquet": ("application/vnd.apache.parquet", "parquet", True),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows", True),
+    "csv.gz": ("application/gzip", "csv.gz", False),
+}
+
+EXPORT_COLUMNS = ("item_id", "serial_code", "name", "store", "item_url", "price", "timestamp",
+                  "last_seen_at", "confirmed_count")
+
+def arrow_schema():
+    return pa.schema([
+        ("item_id", pa.int32()),
+        ("serial_code", pa.string()),
+        ("name", pa.string()),
+        ("store", pa.string()),
+        ("item_url", pa.string()),
+        ("price", pa.float64()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("last_seen_at", pa.timestamp("us", tz="UTC")),
+        ("confirmed_count", pa.int32()),
+    ])
+
+def iter_price_rows(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[list]:
+    """Yields lists of up to `chunk_size` export rows, ordered by item and time.
+
+    The generator owns its session because a streamed response keeps reading after the handler returns.
+    """
+    item, ph = models.Item, models.PriceHistory
+    stmt = (
+        select(ph.item_id, item.serial_code, item.name, item.store, item.item_url,
+               ph.price, ph.timestamp, ph.last_seen_at, ph.confirmed_count)
+        .join(item, item.id == ph.item_id)
+        .order_by(ph.item_id, ph.timestamp)
+        .execution_options(yield_per=chunk_size)
+    )
+    # Prunes partitions outside the range.
+    if start is not None:
+        stmt = stmt.where(ph.timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(ph.timestamp < end)
+    db = SessionLocal()
+    try:
+        for partition in db.execute(stmt).partitions():
+            yield partition
+    finally:
+        db.close()
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object for pyarrow writers whose buffered bytes are handed out after every chunk."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+def _record_batch(rows: list, schema):
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                                      schema=schema)
+
+def _stream_arrow(chunks: Iterator[list], fmt: str) -> Iterator[bytes]:
+    schema = arrow_schema()
+    sink = _DrainableSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    for rows in chunks:
+        writer.write_batch(_record_batch(rows, schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+def _stream_csv_gz(chunks: Iterator[list]) -> Iterator[bytes]:
+    # wbits=31 writes a gzip container, so the stream can be compressed one chunk at a time.
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield compressor.compress(text.getvalue().encode("utf-8"))
+        text.seek(0)
+        text.truncate()
+    yield compressor.compress(text.getvalue().encode("utf-8")) + compressor.flush()
+
+def stream_export(fmt: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Iterator[bytes]:
+    """Encoded bytes of the export, chunk by chunk. Raises RuntimeError if pyarrow is needed but missing."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if EXPORT_FORMATS[fmt][2] and pa is None:
+        raise RuntimeError(f"Exporting {fmt} needs the 'pyarrow' package")
+    chunks = iter_price_rows(start, end)
+    if fmt == "csv.gz":
+        return _stream_csv_gz(chunks)
+    return _stream_arrow(chunks, fmt)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exports items with their price history.")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="parquet")
+    parser.add_argument("--output", help="Output file (default: prices.<extension>).")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="Only prices at or after this ISO timestamp.")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="Only prices before this ISO timestamp.")
+    args = parser.parse_args()
+
+    output = args.output or f"prices.{EXPORT_FORMATS[args.format][1]}"
+    try:
+        stream = stream_export(args.format, args.start, args.end)
+    except RuntimeError as e:
+        parser.error(str(e))
+    written = 0
+    with open(output, "wb") as f:
+        for data in stream:
+            f.write(data)
+            written += len(data)
+    print(f"Wrote {written / 1024 / 1024:.1f} MB to {output}.")
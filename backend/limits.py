@@ -0,0 +1,10 @@
+# backend/limits.py
+
+"""Request size limits shared by the sync routes (main.py) and the async ones (async_api.py)."""
+
+# Upper bounds on how many payloads a single bulk request may carry.
+MAX_BULK_ITEMS = 1000
+MAX_PRICE_BATCH = 5000
+# Page size limits for GET /items/ and the other paged listings.
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
@@ -1,17 +1,33 @@
 # backend/main.py
 
-from typing import List
-from fastapi import FastAPI, Depends, HTTPException
+from datetime import datetime
+from typing import List, Literal, Optional
+from fastapi import FastAPI, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
+import cache
+import crud
+import database
+import export
+import metrics
 import models
+import partitions
 import schemas
 from database import SessionLocal, engine
+from limits import DEFAULT_PAGE_SIZE, MAX_BULK_ITEMS, MAX_PAGE_SIZE, MAX_PRICE_BATCH
 
 models.Base.metadata.create_all(bind=engine)
+# price_history is partitioned by month; make sure the current and coming months have a partition.
+partitions.ensure_partitions()
 
 app = FastAPI()
 
+if database.DB_MODE == "async":
+    import async_api
+    # Registered first, so the async item and price routes shadow the sync ones below.
+    app.include_router(async_api.router)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -20,41 +36,128 @@ def get_db():
         db.close()
 
 @app.post("/items/{item_id}/prices/", response_model=schemas.PriceHistoryCreate)
-def create_price_for_item(item_id: int, price: schemas.PriceHistoryCreate, db: Session = Depends(get_db)):
-    db_price = models.PriceHistory(**price.dict(), item_id=item_id)
-    db.add(db_price)
-    db.commit()
-    db.refresh(db_price)
+def create_price_for_item(item_id: int, price: schemas.PriceHistoryCreate, dedupe: bool = False,
+                          db: Session = Depends(get_db)):
+    crud.create_price(db, item_id, price.price, dedupe=dedupe)
+    return price
+
+@app.get("/items/{item_id}/prices", response_model=List[schemas.PricePoint])
+def read_price_history(item_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                       bucket: Optional[Literal["hour", "day", "week", "month"]] = None,
+                       limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: Session = Depends(get_db)):
+    # `bucket` downsamples the history into hourly/daily/... points with a close price and a min/max range.
+    if db.get(models.Item, item_id) is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return crud.get_price_history(db, item_id, start=start, end=end, bucket=bucket, limit=limit)
+
+@app.get("/items/{item_id}/prices/daily", response_model=List[schemas.PricePoint])
+def read_daily_prices(item_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                      limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: Session = Depends(get_db)):
+    # History older than the retention window only survives as these daily rollups (see partitions.py).
+    if db.get(models.Item, item_id) is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return crud.get_daily_prices(db, item_id, start=start, end=end, limit=limit)
+
+@app.get("/items/{item_id}/price/latest", response_model=schemas.PriceHistory)
+def read_latest_price(item_id: int, db: Session = Depends(get_db)):
+    db_price = crud.get_latest_price(db, item_id)
+    if db_price is None:
+        raise HTTPException(status_code=404, detail="No price recorded for this item")
     return db_price
 
+@app.get("/items/{item_id}/price/summary", response_model=schemas.PriceSummary)
+def read_price_summary(item_id: int, db: Session = Depends(get_db)):
+    db_summary = db.get(models.ItemPriceSummary, item_id)
+    if db_summary is None:
+        raise HTTPException(status_code=404, detail="No price recorded for this item")
+    return db_summary
+
+@app.get("/prices/summary", response_model=List[schemas.PriceSummary])
+def read_price_summaries(response: Response, after: int = 0,
+                         limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: Session = Depends(get_db)):
+    # Current/previous price, 30-day range and last change for every item, paged by item_id like GET /items/.
+    summaries = crud.get_price_summaries(db, after=after, limit=limit)
+    if len(summaries) == limit:
+        response.headers["X-Next-After"] = str(summaries[-1].item_id)
+    return summaries
+
+@app.post("/prices/batch", response_model=schemas.PriceBatchResult)
+def create_prices_batch(observations: List[schemas.PriceObservation], dedupe: bool = False,
+                        db: Session = Depends(get_db)):
+    if len(observations) > MAX_PRICE_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_PRICE_BATCH} prices per request")
+    return crud.insert_price_batch(db, observations, dedupe=dedupe)
 
 # --- NEW ENDPOINT STARTS HERE ---
 @app.get("/items/by_serial_code/{serial_code}", response_model=schemas.Item)
 def read_item_by_serial_code(serial_code: str, db: Session = Depends(get_db)):
-    db_item = db.query(models.Item).filter(models.Item.serial_code == serial_code).first()
+    db_item = crud.get_item_by_serial_code(db, serial_code)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     return db_item
 # --- NEW ENDPOINT ENDS HERE ---
 
 @app.get("/items/", response_model=List[schemas.Item])
-def read_items(db: Session = Depends(get_db)):
-    items = db.query(models.Item).all()
+def read_items(response: Response, after: int = 0, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+               db: Session = Depends(get_db)):
+    # Keyset pagination: pass the last id you received as `after` to get the next page.
+    items = crud.get_items_page(db, after=after, limit=limit)
+    if len(items) == limit:
+        response.headers["X-Next-After"] = str(items[-1].id)
     return items
 
+@app.get("/items/known/{field}")
+def read_known_filter(field: Literal["serial_code", "item_url"], error_rate: float = 0.0001,
+                      db: Session = Depends(get_db)):
+    # Bloom filter snapshot for scrapers to check items locally (format in bloom.py).
+    if error_rate not in crud.KNOWN_FILTER_ERROR_RATES:
+        allowed = ", ".join(str(rate) for rate in crud.KNOWN_FILTER_ERROR_RATES)
+        raise HTTPException(status_code=422, detail=f"error_rate must be one of {allowed}")
+    known = crud.get_known_filter(db, field, error_rate)
+    return Response(content=known.to_bytes(), media_type="application/octet-stream")
+
+@app.get("/items/stream")
+def stream_items(after: int = 0):
+    # The whole catalogue as newline-delimited JSON, read through a server-side cursor.
+    return StreamingResponse(crud.stream_items_ndjson(after=after), media_type="application/x-ndjson")
+
+@app.get("/export/prices")
+def export_prices(format: Literal["parquet", "arrow", "csv.gz"] = "parquet",
+                  start: Optional[datetime] = None, end: Optional[datetime] = None):
+    # Items joined with their price history, encoded chunk by chunk from a server-side cursor.
+    try:
+        stream = export.stream_export(format, start, end)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    media_type, extension, _ = export.EXPORT_FORMATS[format]
+    headers = {"Content-Disposition": f'attachment; filename="prices.{extension}"'}
+    return StreamingResponse(stream, media_type=media_type, headers=headers)
+
 @app.post("/items/", response_model=schemas.Item)
 def create_item(item: schemas.ItemCreate, db: Session = Depends(get_db)):
     # Check if item already exists
-    db_item = db.query(models.Item).filter(models.Item.serial_code == item.serial_code).first()
+    db_item = crud.get_item_by_serial_code(db, item.serial_code)
     if db_item:
         raise HTTPException(status_code=400, detail="Serial code already registered")
-    
-    db_item = models.Item(**item.dict())
-    db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
+    db_item = crud.create_item(db, item)
+    if db_item is None:
+        raise HTTPException(status_code=400, detail="Serial code already registered")
     return db_item
 
+@app.post("/items/bulk", response_model=List[schemas.ItemBulkResult])
+def create_items_bulk(items: List[schemas.ItemCreate], db: Session = Depends(get_db)):
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ITEMS} items per request")
+    return crud.bulk_upsert_items(db, items)
+
+@app.get("/metrics")
+def read_metrics():
+    # Connection pool usage, how long requests waited for a database connection, and serial code cache hits.
+    data = {"pool": metrics.POOL_METRICS.snapshot(engine.pool), "item_cache": cache.ITEM_CACHE.snapshot()}
+    if database.DB_MODE == "async":
+        data["async_pool"] = metrics.ASYNC_POOL_METRICS.snapshot(async_api.async_engine.sync_engine.pool)
+    return data
+
 @app.get("/")
 def read_root():
     return {"status": "API is running"}
\ No newline at end of file
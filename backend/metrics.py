@@ -0,0 +1,99 @@
+# backend/metrics.py
+
+import contextvars
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds (seconds) of the checkout wait histogram; anything slower falls in "+Inf".
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+class PoolMetrics:
+    """Counts connection pool checkouts and how long requests waited for a connection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def observe(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            index = next((i for i, bound in enumerate(WAIT_BUCKETS) if seconds <= bound), len(WAIT_BUCKETS))
+            self.wait_buckets[index] += 1
+
+    def snapshot(self, pool=None) -> dict:
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            data = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / waits, 6) if waits else 0.0,
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_buckets": {
+                    str(bound): count for bound, count in zip(WAIT_BUCKETS + ("+Inf",), self.wait_buckets)
+                },
+            }
+        if isinstance(pool, QueuePool):
+            data.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow(),
+                        checked_in=pool.checkedin())
+        return data
+
+POOL_METRICS = PoolMetrics()
+# Checkouts from the asyncpg engine used when DB_MODE=async.
+ASYNC_POOL_METRICS = PoolMetrics()
+
+# Seconds spent opening new connections during the checkout in progress (one list per checkout).
+# A context variable rather than a thread local: async checkouts share the event loop thread.
+_connect_seconds = contextvars.ContextVar("connect_seconds", default=None)
+
+class _TimedCheckout:
+    """Pool mixin that records how long every checkout waited for a free connection.
+
+    Time spent opening an overflow connection is not waiting for the pool, so it is left out.
+    """
+
+    metrics = POOL_METRICS
+
+    def _do_get(self):
+        if _connect_seconds.get() is not None:
+            # QueuePool retries by calling _do_get again; the outermost call does the timing.
+            return super()._do_get()
+        connect_seconds = []
+        token = _connect_seconds.set(connect_seconds)
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.observe(time.perf_counter() - started - sum(connect_seconds), timed_out=True)
+            raise
+        finally:
+            _connect_seconds.reset(token)
+        self.metrics.observe(time.perf_counter() - started - sum(connect_seconds))
+        return connection
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            connect_seconds = _connect_seconds.get()
+            if connect_seconds is not None:
+                connect_seconds.append(time.perf_counter() - started)
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics = ASYNC_POOL_METRICS
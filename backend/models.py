@@ -1,6 +1,6 @@
 # backend/models.py
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -16,14 +16,54 @@ class Item(Base):
     
     # This creates the one-to-many relationship. One Item can have many PriceHistory records.
     prices = relationship("PriceHistory", back_populates="item")
+    price_summary = relationship("ItemPriceSummary", back_populates="item", uselist=False)
 
 class PriceHistory(Base):
     __tablename__ = "price_history"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # The table is partitioned by month on timestamp, so the timestamp is part of the primary key.
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     price = Column(Float, nullable=False)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    timestamp = Column(DateTime(timezone=True), primary_key=True, nullable=False, server_default=func.now())
+    # With change-only recording a row stands until the price changes: these track its repeats.
+    last_seen_at = Column(DateTime(timezone=True))
+    confirmed_count = Column(Integer, nullable=False, default=1, server_default="1")
     item_id = Column(Integer, ForeignKey("items.id"))
 
     # This links back to the Item class.
-    item = relationship("Item", back_populates="prices")
\ No newline at end of file
+    item = relationship("Item", back_populates="prices")
+
+    # Serves per-item history and "latest price" lookups without scanning the whole table.
+    __table_args__ = (
+        Index("ix_price_history_item_id_timestamp", item_id, timestamp.desc()),
+        # Partitions are created by partitions.ensure_partitions(); see migration 0005.
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+    # The server-side timestamp is part of the identity, so fetch it (RETURNING) on insert.
+    __mapper_args__ = {"eager_defaults": True}
+
+class ItemPriceSummary(Base):
+    """One row per item, kept up to date on every price insert so dashboards never scan price_history."""
+    __tablename__ = "item_price_summary"
+
+    item_id = Column(Integer, ForeignKey("items.id"), primary_key=True)
+    current_price = Column(Float, nullable=False)
+    # The price the item had before its last change (None until the price changes once).
+    previous_price = Column(Float)
+    min_price_30d = Column(Float, nullable=False)
+    max_price_30d = Column(Float, nullable=False)
+    last_change_at = Column(DateTime(timezone=True), nullable=False)
+    last_observed_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    item = relationship("Item", back_populates="price_summary")
+
+class PriceHistoryDaily(Base):
+    """Daily min/max/close of raw price rows whose partition was dropped by retention (partitions.py)."""
+    __tablename__ = "price_history_daily"
+
+    item_id = Column(Integer, ForeignKey("items.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    min_price = Column(Float, nullable=False)
+    max_price = Column(Float, nullable=False)
+    close_price = Column(Float, nullable=False)
+    observations = Column(Integer, nullable=False)
\ No newline at end of file
@@ -0,0 +1,205 @@
+# backend/partitions.py
+
+"""Monthly partitions of price_history: creating them ahead of time, and retention with daily rollups.
+
+The API calls ensure_partitions() at startup and before writing prices. Retention is meant for cron:
+
+    python partitions.py ensure --months-ahead 3
+    python partitions.py retention --keep-months 6 --dry-run
+"""
+
+import argparse
+import re
+import threading
+from datetime import date, datetime, timezone
+from typing import Iterable, List
+
+from sqlalchemy import text
+
+from database import engine
+
+PARENT_TABLE = "price_history"
+# Catches rows outside every monthly range, so an insert never fails for lack of a partition.
+DEFAULT_PARTITION = "price_history_default"
+ROLLUP_TABLE = "price_history_daily"
+PARTITION_NAME = re.compile(r"^price_history_p(\d{4})_(\d{2})$")
+# Partitions are kept ready for this many months after the current one.
+MONTHS_AHEAD = 2
+# Raw rows are kept for the current month plus this many minus one; older months only survive as daily rollups.
+KEEP_MONTHS = 6
+
+# Daily min/max/close of the raw rows that are about to be dropped. Merges with existing days so
+# re-running retention (or rolling up stray rows from the default partition) never loses data.
+ROLLUP_SQL = """
+INSERT INTO price_history_daily (item_id, day, min_price, max_price, close_price, observations)
+SELECT item_id,
+       (timestamp AT TIME ZONE 'UTC')::date AS day,
+       min(price),
+       max(price),
+       (array_agg(price ORDER BY timestamp DESC))[1],
+       sum(confirmed_count)
+FROM {source} AS old
+WHERE {condition}
+GROUP BY item_id, day
+ON CONFLICT (item_id, day) DO UPDATE SET
+    min_price = least(price_history_daily.min_price, excluded.min_price),
+    max_price = greatest(price_history_daily.max_price, excluded.max_price),
+    close_price = excluded.close_price,
+    observations = price_history_daily.observations + excluded.observations
+"""
+
+# True for a row that is still its item's newest price. Retention keeps these rows, so every item
+# keeps its current price in the raw history; they are rolled up once a newer price replaces them.
+LATEST_ROW = ("NOT EXISTS (SELECT 1 FROM price_history AS newer "
+              "WHERE newer.item_id = old.item_id AND newer.timestamp > old.timestamp)")
+_COLUMNS = "id, price, timestamp, last_seen_at, confirmed_count, item_id"
+
+# Months (first day, UTC) known to have a partition, so writers skip the catalog lookup.
+_known_months = set()
+_lock = threading.Lock()
+
+def month_start(value) -> date:
+    """First day of the UTC month containing `value` (a date or datetime)."""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return date(value.year, value.month, 1)
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f"price_history_p{month:%Y_%m}"
+
+def _bound(month: date) -> str:
+    return f"{month.isoformat()} 00:00:00+00"
+
+def _is_partitioned(conn) -> bool:
+    # Development databases (SQLite, or Postgres created before migration 0005) have a plain table.
+    if conn.dialect.name != "postgresql":
+        return False
+    relkind = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": PARENT_TABLE}
+    ).scalar()
+    return relkind == "p"
+
+def existing_partitions(conn) -> List[date]:
+    """Months that currently have their own partition, oldest first."""
+    names = conn.execute(
+        text("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+             "WHERE i.inhparent = to_regclass(:table)"),
+        {"table": PARENT_TABLE},
+    ).scalars()
+    months = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            months.append(date(int(match[1]), int(match[2]), 1))
+    return sorted(months)
+
+def _create_partition(conn, month: date):
+    name, lower, upper = partition_name(month), _bound(month), _bound(add_months(month, 1))
+    bounds = {"lower": lower, "upper": upper}
+    in_default = conn.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE timestamp >= :lower AND timestamp < :upper)"),
+        bounds,
+    ).scalar()
+    if not in_default:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} FOR VALUES FROM ('{lower}') TO ('{upper}')"
+        ))
+        return
+    # Postgres refuses a new range while the default partition holds rows for it: move them over first.
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)"))
+    conn.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE timestamp >= :lower AND timestamp < :upper RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), bounds)
+    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')"))
+
+def ensure_partitions(months: Iterable = (), months_ahead: int = MONTHS_AHEAD, bind=None) -> List[date]:
+    """Creates the missing monthly partitions and returns the months created.
+
+    Covers the current month through `months_ahead`, plus the months of `months` (timestamps about to
+    be written) unless retention has already dropped them; those rows go to the default partition.
+    Cheap once every wanted month is known, so writers can call it on each batch.
+    """
+    this_month = month_start(datetime.now(timezone.utc))
+    oldest_kept = add_months(this_month, 1 - KEEP_MONTHS)
+    wanted = {month for month in map(month_start, months) if month >= oldest_kept}
+    wanted.update(add_months(this_month, offset) for offset in range(months_ahead + 1))
+    if wanted <= _known_months:
+        return []
+
+    created = []
+    with _lock, (bind or engine).begin() as conn:
+        if not _is_partitioned(conn):
+            _known_months.update(wanted)
+            return created
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+        existing = set(existing_partitions(conn))
+        for month in sorted(wanted - existing):
+            _create_partition(conn, month)
+            created.append(month)
+        _known_months.update(existing, wanted)
+    return created
+
+def apply_retention(keep_months: int = KEEP_MONTHS, dry_run: bool = False, bind=None) -> List[str]:
+    """Rolls every partition older than `keep_months` into price_history_daily, then drops it.
+
+    Rows that are still their item's latest price are not rolled up: they move to the default
+    partition unchanged, and are rolled up by a later run once a newer price replaces them.
+    Each partition is handled in its own transaction, so a failure never loses rows.
+    Returns the names of the partitions dropped (or that would be, with `dry_run`).
+    """
+    cutoff = add_months(month_start(datetime.now(timezone.utc)), 1 - keep_months)
+    bind = bind or engine
+    with bind.connect() as conn:
+        if not _is_partitioned(conn):
+            return []
+        expired = [month for month in existing_partitions(conn) if month < cutoff]
+    if dry_run:
+        return [partition_name(month) for month in expired]
+
+    for month in expired:
+        name = partition_name(month)
+        with bind.begin() as conn:
+            conn.execute(text(ROLLUP_SQL.format(source=name, condition=f"item_id IS NOT NULL AND NOT {LATEST_ROW}")))
+            conn.execute(text(
+                f"CREATE TEMP TABLE retained ON COMMIT DROP AS "
+                f"SELECT {_COLUMNS} FROM {name} AS old WHERE item_id IS NOT NULL AND {LATEST_ROW}"
+            ))
+            conn.execute(text(f"DROP TABLE {name}"))
+            # With the month's partition gone, the rows land in the default partition.
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+            conn.execute(text(f"INSERT INTO {PARENT_TABLE} ({_COLUMNS}) SELECT {_COLUMNS} FROM retained"))
+        _known_months.discard(month)
+    # Late observations for expired months land in the default partition; fold them in as well.
+    with bind.begin() as conn:
+        bounds = {"cutoff": _bound(cutoff)}
+        condition = f"item_id IS NOT NULL AND timestamp < :cutoff AND NOT {LATEST_ROW}"
+        conn.execute(text(ROLLUP_SQL.format(source=DEFAULT_PARTITION, condition=condition)), bounds)
+        conn.execute(text(
+            f"DELETE FROM {DEFAULT_PARTITION} AS old WHERE timestamp < :cutoff AND (item_id IS NULL OR NOT {LATEST_ROW})"
+        ), bounds)
+    return [partition_name(month) for month in expired]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintains the monthly partitions of price_history.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ensure_parser = commands.add_parser("ensure", help="Create partitions for the coming months.")
+    ensure_parser.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD)
+    retention_parser = commands.add_parser("retention", help="Roll old partitions into daily aggregates and drop them.")
+    retention_parser.add_argument("--keep-months", type=int, default=KEEP_MONTHS)
+    retention_parser.add_argument("--dry-run", action="store_true", help="Only list the partitions that would be dropped.")
+    args = parser.parse_args()
+
+    if args.command == "ensure":
+        created = ensure_partitions(months_ahead=args.months_ahead)
+        print(f"Created {len(created)} partitions: {', '.join(map(partition_name, created)) or '-'}")
+    else:
+        if args.keep_months < 1:
+            parser.error("--keep-months must be at least 1")
+        dropped = apply_retention(keep_months=args.keep_months, dry_run=args.dry_run)
+        verb = "Would drop" if args.dry_run else "Rolled up and dropped"
+        print(f"{verb} {len(dropped)} partitions: {', '.join(dropped) or '-'}")
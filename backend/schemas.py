@@ -1,10 +1,32 @@
 # backend/schemas.py
 
+from datetime import datetime
+from typing import List, Literal, Optional
 from pydantic import BaseModel
 
 class PriceHistoryCreate(BaseModel):
     price: float
 
+class PriceHistory(PriceHistoryCreate):
+    id: int
+    item_id: int
+    timestamp: datetime
+    last_seen_at: Optional[datetime] = None
+    confirmed_count: int = 1
+
+    class Config:
+        from_attributes = True
+
+class PricePoint(BaseModel):
+    # Raw rows carry a single price; downsampled buckets carry the bucket's closing price plus its range.
+    timestamp: datetime
+    price: float
+    min_price: float
+    max_price: float
+    count: int = 1
+    # Newest observation that confirmed a raw row's price (change-only recording); None if never repeated.
+    last_seen_at: Optional[datetime] = None
+
 class ItemCreate(BaseModel):
     name: str
     serial_code: str
@@ -16,4 +38,40 @@ class Item(ItemCreate):
     id: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ItemBulkResult(BaseModel):
+    serial_code: str
+    id: Optional[int] = None
+    status: Literal["created", "existing", "conflict"]
+
+
+class PriceObservation(BaseModel):
+    item_id: int
+    price: float
+    # When the price was seen by the scraper; the server time is used if omitted.
+    observed_at: Optional[datetime] = None
+
+class PriceBatchError(BaseModel):
+    index: int
+    item_id: int
+    detail: str
+
+class PriceBatchResult(BaseModel):
+    inserted: int
+    # Observations that matched the current price and only confirmed the latest row (dedupe mode).
+    confirmed: int = 0
+    errors: List[PriceBatchError]
+
+
+class PriceSummary(BaseModel):
+    item_id: int
+    current_price: float
+    previous_price: Optional[float] = None
+    min_price_30d: float
+    max_price_30d: float
+    last_change_at: datetime
+    last_observed_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,200 @@
+# scraper/api_client.py
+
+import datetime
+import time
+from abc import ABC, abstractmethod
+
+import requests
+
+from bloom import BloomFilter
+
+# --- API Definitions ---
+API_URL = "http://127.0.0.1:8000"
+# How many scraped items are sent to POST /items/bulk in one request.
+BULK_BATCH_SIZE = 200
+# How many price observations are sent to POST /prices/batch in one request.
+PRICE_BATCH_SIZE = 500
+# How many items are requested per page from GET /items/ (and summaries from GET /prices/summary).
+ITEMS_PAGE_SIZE = 500
+# Seconds a buffer waits before sending again after a failed batch, doubled per failure up to the maximum.
+FLUSH_RETRY_DELAY = 5
+FLUSH_RETRY_MAX_DELAY = 300
+
+# A single session keeps the connection to the backend alive between calls.
+api_session = requests.Session()
+
+def iter_items(page_size: int = ITEMS_PAGE_SIZE):
+    """Yields every item from GET /items/, one keyset page at a time, so only one page is held in memory."""
+    after = 0
+    while True:
+        response = api_session.get(f"{API_URL}/items/", params={"after": after, "limit": page_size}, timeout=60)
+        response.raise_for_status()
+        page = response.json()
+        yield from page
+        next_after = response.headers.get("X-Next-After")
+        if not next_after:
+            return
+        after = int(next_after)
+
+def iter_price_summaries(page_size: int = ITEMS_PAGE_SIZE):
+    """Yields the price summary of every item that has a price, one keyset page at a time."""
+    after = 0
+    while True:
+        response = api_session.get(f"{API_URL}/prices/summary", params={"after": after, "limit": page_size}, timeout=60)
+        response.raise_for_status()
+        yield from response.json()
+        next_after = response.headers.get("X-Next-After")
+        if not next_after:
+            return
+        after = int(next_after)
+
+def save_items_bulk(items: list) -> list:
+    """Sends a batch of items to POST /items/bulk. Returns the per-item results, or None on failure."""
+    if not items:
+        return []
+    try:
+        response = api_session.post(f"{API_URL}/items/bulk", json=items, timeout=60)
+        if response.status_code == 200:
+            return response.json()
+        print(f"❌ Bulk save failed. API Status: {response.status_code}")
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Error during bulk save: {e.__class__.__name__}")
+    return None
+
+def post_price_batch(observations: list, dedupe: bool = False) -> dict:
+    """Sends a batch of price observations to POST /prices/batch. Returns the API result, or None on failure.
+
+    With `dedupe`, the backend only stores prices that changed; repeats just confirm the latest row.
+    """
+    if not observations:
+        return {"inserted": 0, "confirmed": 0, "errors": []}
+    try:
+        params = {"dedupe": "true"} if dedupe else None
+        response = api_session.post(f"{API_URL}/prices/batch", json=observations, params=params, timeout=60)
+        if response.status_code == 200:
+            return response.json()
+        print(f"❌ Price batch failed. API Status: {response.status_code}")
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Error during price batch: {e.__class__.__name__}")
+    return None
+
+def fetch_known_filter(field: str, error_rate: float = 0.0001) -> BloomFilter:
+    """Downloads the Bloom filter of known serial codes or item URLs. Returns None on failure."""
+    try:
+        response = api_session.get(f"{API_URL}/items/known/{field}", params={"error_rate": error_rate}, timeout=120)
+        if response.status_code == 200:
+            known = BloomFilter.from_bytes(response.content)
+            print(f"-> Downloaded known {field} filter ({len(response.content) // 1024} KB).")
+            return known
+        print(f"❌ Known {field} filter unavailable. API Status: {response.status_code}")
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"❌ Error downloading known {field} filter: {e.__class__.__name__}")
+    return None
+
+class ChunkedBuffer(ABC):
+    """Queue of records sent to the backend in chunks of at most `batch_size`.
+
+    A chunk that fails stays queued, together with everything after it, and sending pauses
+    with an exponential backoff, so a backend outage neither grows the requests past the
+    endpoint's limit nor re-sends the backlog on every add.
+    """
+
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        self.pending = []
+        self.failures = 0
+        self.retry_at = 0.0
+
+    @abstractmethod
+    def _send(self, batch: list) -> bool:
+        """Sends one chunk. Returns True if the backend accepted it."""
+
+    def _queue(self, record: dict):
+        self.pending.append(record)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self, force: bool = False) -> bool:
+        """Sends everything queued so far. Returns True once nothing is left.
+
+        While backing off from a failure nothing is sent, unless `force` (for the final flush).
+        """
+        if not force and time.monotonic() < self.retry_at:
+            return not self.pending
+        while self.pending:
+            batch = self.pending[:self.batch_size]
+            if not self._send(batch):
+                self.failures += 1
+                delay = min(FLUSH_RETRY_DELAY * 2 ** (self.failures - 1), FLUSH_RETRY_MAX_DELAY)
+                self.retry_at = time.monotonic() + delay
+                return False
+            del self.pending[:len(batch)]
+            self.failures = 0
+        return True
+
+class ItemBuffer(ChunkedBuffer):
+    """Collects scraped items in memory and saves them through the bulk endpoint in batches."""
+
+    def __init__(self, batch_size: int = BULK_BATCH_SIZE, on_saved=None, on_failed=None):
+        super().__init__(batch_size)
+        # Called with the list of item URLs that the backend confirmed (created or already existing).
+        self.on_saved = on_saved
+        # Called with the list of item URLs the backend refused (serial code taken by another URL).
+        self.on_failed = on_failed
+
+    def add(self, item_data: dict) -> bool:
+        """Queues an item for saving. Returns False if the item can never be saved."""
+        if not item_data.get("serial_code"):
+            print("❌ No serial code found, cannot save.")
+            return False
+        self._queue(item_data)
+        return True
+
+    def _send(self, batch: list) -> bool:
+        results = save_items_bulk(batch)
+        if results is None:
+            return False
+
+        saved_urls, failed_urls, created, existing = [], [], 0, 0
+        for item, result in zip(batch, results):
+            if result["status"] == "created":
+                created += 1
+            elif result["status"] == "existing":
+                existing += 1
+            else:
+                print(f"❌ Item '{item['serial_code']}' conflicts with an existing item URL. Not saved.")
+                failed_urls.append(item["item_url"])
+                continue
+            saved_urls.append(item["item_url"])
+        print(f"✅ Bulk saved {len(batch)} items: {created} new, {existing} already existed.")
+        if self.on_saved:
+            self.on_saved(saved_urls)
+        if failed_urls and self.on_failed:
+            self.on_failed(failed_urls)
+        return True
+
+class PriceBuffer(ChunkedBuffer):
+    """Collects price observations and writes them through the batch endpoint."""
+
+    def __init__(self, batch_size: int = PRICE_BATCH_SIZE, dedupe: bool = False, on_saved=None):
+        super().__init__(batch_size)
+        self.dedupe = dedupe
+        # Called with the item ids whose observations the backend accepted.
+        self.on_saved = on_saved
+
+    def add(self, item_id: int, price: float):
+        observed_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        self._queue({"item_id": item_id, "price": price, "observed_at": observed_at})
+
+    def _send(self, batch: list) -> bool:
+        result = post_price_batch(batch, dedupe=self.dedupe)
+        if result is None:
+            return False
+        for error in result["errors"]:
+            print(f"❌ Price for item {error['item_id']} rejected: {error['detail']}")
+        print(f"✅ Logged {result['inserted']} new prices, {result.get('confirmed', 0)} unchanged "
+              f"({len(result['errors'])} rejected).")
+        if self.on_saved:
+            rejected = {error["index"] for error in result["errors"]}
+            self.on_saved([obs["item_id"] for index, obs in enumerate(batch) if index not in rejected])
+        return True
@@ -0,0 +1,219 @@
+# scraper/async_engine.py
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Iterable, Optional
+from urllib.parse import urlparse
+
+import httpx
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError, async_playwright
+
+from http_fetch import PUSHBACK_STATUS_CODES, USER_AGENT, is_pushback, needs_browser
+from proxy_pool import ProxyPool
+from rate_limiter import RateLimiter
+from resource_blocking import DEFAULT_PROFILE, PRODUCT_READY_SELECTOR, install_blocking_async
+
+# --- Engine Defaults ---
+DEFAULT_CONCURRENCY = 20   # Fetches kept in flight per worker process.
+DEFAULT_PER_HOST = 8       # Concurrent requests against a single target host.
+DEFAULT_PER_PROXY = 2      # Concurrent requests routed through a single proxy.
+DEFAULT_BROWSER_SLOTS = 2  # Concurrent Playwright pages used for CAPTCHA/JS-gated fallbacks.
+
+class FetchError(Exception):
+    """Raised when a URL could not be fetched through any proxy."""
+
+class AsyncScrapeEngine:
+    """Keeps many fetches in flight from one process, bounded globally, per host and per proxy.
+
+    Pages are fetched with httpx; pages that need a real browser are rendered with a single
+    shared async Playwright browser that gets a fresh context per proxy.
+    """
+
+    def __init__(self, proxy_pool: ProxyPool, concurrency: int = DEFAULT_CONCURRENCY,
+                 per_host: int = DEFAULT_PER_HOST, per_proxy: int = DEFAULT_PER_PROXY,
+                 max_attempts: int = 5, timeout: float = 20, browser_slots: int = DEFAULT_BROWSER_SLOTS,
+                 block_profile: str = DEFAULT_PROFILE, ready_selector: str = PRODUCT_READY_SELECTOR,
+                 gated: Callable[[str], bool] = needs_browser, limiter: RateLimiter = None):
+        self.proxy_pool = proxy_pool
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.per_proxy = per_proxy
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.block_profile = block_profile
+        self.ready_selector = ready_selector
+        # Tells from the plain HTML whether the page has to be rendered in a browser instead.
+        self.gated = gated
+        # Paces requests per host and per proxy; shared by everything fetched through this engine.
+        self.limiter = limiter or RateLimiter()
+        self.host_slots = {}
+        self.proxy_slots = {}
+        self.clients = {}
+        # Requests currently using each client, and clients of bad proxies waiting for theirs to finish.
+        self.in_flight = {}
+        self.retired = set()
+        self.browser_slots = asyncio.Semaphore(browser_slots)
+        self.playwright = None
+        self.browser = None
+        self.browser_lock = asyncio.Lock()
+
+    # --- Limits ---
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self.host_slots:
+            self.host_slots[host] = asyncio.Semaphore(self.per_host)
+        return self.host_slots[host]
+
+    def _proxy_slot(self, proxy: str) -> asyncio.Semaphore:
+        if proxy not in self.proxy_slots:
+            self.proxy_slots[proxy] = asyncio.Semaphore(self.per_proxy)
+        return self.proxy_slots[proxy]
+
+    async def _pick_proxy(self) -> Optional[str]:
+        """Picks by pool score, preferring proxies that still have free slots. Waits out short quarantines."""
+        while True:
+            busy = [p for p, slot in self.proxy_slots.items() if slot.locked()]
+            proxy = self.proxy_pool.acquire(exclude=busy) or self.proxy_pool.acquire()
+            if proxy is not None:
+                return proxy
+            wait = self.proxy_pool.wait_time()
+            if wait > 60:
+                return None
+            await asyncio.sleep(wait + 0.1)
+
+    async def mark_bad(self, proxy: str):
+        self.proxy_pool.report_failure(proxy)
+        client = self.clients.pop(proxy, None)
+        if client is None:
+            return
+        # Other fetches may still be using the client; the last one to finish closes it.
+        if self.in_flight.get(client):
+            self.retired.add(client)
+        else:
+            await client.aclose()
+
+    # --- Fetching ---
+    def _client_for(self, proxy: str) -> httpx.AsyncClient:
+        client = self.clients.get(proxy)
+        if client is None:
+            limits = httpx.Limits(max_connections=self.per_proxy, max_keepalive_connections=self.per_proxy)
+            client = httpx.AsyncClient(proxy=proxy, limits=limits, timeout=self.timeout, follow_redirects=True,
+                                       headers={"User-Agent": USER_AGENT, "Accept-Language": "tr-TR,tr;q=0.9,en;q=0.8"})
+            self.clients[proxy] = client
+        return client
+
+    async def _get(self, url: str, proxy: str) -> httpx.Response:
+        client = self._client_for(proxy)
+        self.in_flight[client] = self.in_flight.get(client, 0) + 1
+        try:
+            return await client.get(url)
+        finally:
+            self.in_flight[client] -= 1
+            if not self.in_flight[client]:
+                del self.in_flight[client]
+                if client in self.retired:
+                    self.retired.discard(client)
+                    await client.aclose()
+
+    async def _fetch_with_browser(self, url: str, proxy: str) -> str:
+        async with self.browser_lock:
+            if self.browser is None:
+                self.playwright = await async_playwright().start()
+                # Every context sets its own proxy, so the launch proxy is only a placeholder.
+                self.browser = await self.playwright.chromium.launch(headless=True, proxy={"server": "http://per-context"})
+        async with self.browser_slots:
+            context = await self.browser.new_context(user_agent=USER_AGENT, proxy={"server": proxy})
+            try:
+                await install_blocking_async(context, self.block_profile)
+                page = await context.new_page()
+                # Resolve as soon as the data we parse is in the DOM rather than at network idle.
+                await page.goto(url, wait_until="commit", timeout=30000)
+                await page.wait_for_selector(self.ready_selector, state="attached", timeout=30000)
+                return await page.content()
+            finally:
+                await context.close()
+
+    async def fetch(self, url: str) -> str:
+        """Returns the HTML of a page, trying up to max_attempts proxies. Raises FetchError.
+
+        An error status other than 403/429 (e.g. a 404 for a removed product) fails right away:
+        the proxy did its job, and a browser would only render the same error page.
+        """
+        for attempt in range(self.max_attempts):
+            proxy = await self._pick_proxy()
+            if proxy is None:
+                raise FetchError("Every proxy is quarantined.")
+            await self.limiter.wait_async(url, proxy)
+            try:
+                async with self._host_slot(url), self._proxy_slot(proxy):
+                    start_time = time.monotonic()
+                    response = await self._get(url, proxy)
+                    html = response.text
+                    self.limiter.record(url, proxy, throttled=is_pushback(response.status_code, html))
+                    if response.status_code >= 400 and response.status_code not in PUSHBACK_STATUS_CODES:
+                        self.proxy_pool.report_success(proxy, time.monotonic() - start_time)
+                        raise FetchError(f"HTTP {response.status_code}")
+                    if response.status_code not in PUSHBACK_STATUS_CODES and not self.gated(html):
+                        self.proxy_pool.report_success(proxy, time.monotonic() - start_time)
+                        return html
+                    print(f"🧭 {url} needs a browser. Falling back to Playwright.")
+                    await self.limiter.wait_async(url, proxy)
+                    html = await self._fetch_with_browser(url, proxy)
+                    self.limiter.record(url, proxy)
+                    self.proxy_pool.report_success(proxy, time.monotonic() - start_time)
+                    return html
+            except FetchError:
+                raise
+            except Exception as e:
+                if isinstance(e, (httpx.TimeoutException, PlaywrightTimeoutError)):
+                    self.limiter.record(url, proxy, throttled=True)
+                print(f"❌ Fetch via {proxy} failed for {url}. Error: {e.__class__.__name__}. Quarantining proxy.")
+                await self.mark_bad(proxy)
+        raise FetchError(f"All {self.max_attempts} attempts failed.")
+
+    async def render(self, url: str) -> str:
+        """Renders a page in the browser through one proxy, without trying plain HTTP first.
+
+        Errors (including a PlaywrightTimeoutError when the ready selector never shows up) are
+        raised to the caller, which knows whether they say anything about the proxy.
+        """
+        proxy = await self._pick_proxy()
+        if proxy is None:
+            raise FetchError("Every proxy is quarantined.")
+        await self.limiter.wait_async(url, proxy)
+        async with self._host_slot(url), self._proxy_slot(proxy):
+            start_time = time.monotonic()
+            html = await self._fetch_with_browser(url, proxy)
+            self.limiter.record(url, proxy)
+            self.proxy_pool.report_success(proxy, time.monotonic() - start_time)
+            return html
+
+    # --- Running ---
+    async def run(self, urls: Iterable[str], handle_url: Callable[[str], Awaitable[None]]):
+        """Calls handle_url for every URL, keeping at most `concurrency` calls in flight."""
+        queue = asyncio.Queue()
+        for url in urls:
+            queue.put_nowait(url)
+
+        async def consumer():
+            while True:
+                try:
+                    url = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    await handle_url(url)
+                except Exception as e:
+                    print(f"❌ Unhandled error for {url}: {e.__class__.__name__}")
+
+        await asyncio.gather(*(consumer() for _ in range(self.concurrency)))
+
+    async def close(self):
+        for client in [*self.clients.values(), *self.retired]:
+            await client.aclose()
+        self.clients.clear()
+        self.retired.clear()
+        if self.browser:
+            await self.browser.close()
+        if self.playwright:
+            await self.playwright.stop()
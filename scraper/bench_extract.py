@@ -0,0 +1,105 @@
+# scraper/bench_extract.py
+
+"""Micro-benchmark of product page parsing: the old BeautifulSoup paths against extractors.py.
+
+Two baselines are measured: the original scraper's full BeautifulSoup parse, and the
+SoupStrainer-limited parse the HTTP fetch mode used before extractors.py. Runs every parser over
+saved product pages, checks they produce the same item and reports the CPU time per page. Without arguments it uses the bundled fixture, which is a synthetic page
+shaped like a Koton product page (JSON-LD, GA4 div, large inline scripts), not a real capture:
+
+    python bench_extract.py
+    python bench_extract.py saved_pages/*.html --repeat 200
+"""
+
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from koton_scraper import parse_koton_product
+
+# --- File Definitions ---
+DEFAULT_FIXTURE = Path(__file__).parent / "fixtures" / "koton_product_synthetic.html"
+
+# --- Previous Implementations (baselines) ---
+def find_first_json_object(text: str):
+    """Safely extracts the first complete JSON object from a string."""
+    open_braces, start_index = 0, -1
+    for i, char in enumerate(text):
+        if char == '{':
+            if start_index == -1: start_index = i
+            open_braces += 1
+        elif char == '}':
+            open_braces -= 1
+            if open_braces == 0 and start_index != -1:
+                return text[start_index:i+1]
+    return None
+
+PRODUCT_FRAGMENT_STRAINER = SoupStrainer(['script', 'div'])
+
+def parse_koton_product_soup(html_content: str, url: str) -> dict:
+    """The original scraper: a full html.parser parse of the page."""
+    return parse_product_soup(BeautifulSoup(html_content, 'html.parser'), url)
+
+def parse_koton_product_strained(html_content: str, url: str) -> dict:
+    """Modified baseline: only <script> and <div> elements are built (the HTTP fetch mode before extractors.py)."""
+    return parse_product_soup(BeautifulSoup(html_content, 'html.parser', parse_only=PRODUCT_FRAGMENT_STRAINER), url)
+
+def parse_product_soup(soup: BeautifulSoup, url: str) -> dict:
+    product_data = None
+    scripts = soup.find_all('script', type='application/ld+json')
+    for script in scripts:
+        if script.string and '"@type": "Product"' in script.string:
+            json_string = find_first_json_object(script.string)
+            if json_string:
+                product_data = json.loads(json_string)
+                break
+    if not product_data: raise ValueError("Could not find/parse Product JSON-LD.")
+
+    ga4_script = soup.find('div', class_='js-ga4-product')
+    if not ga4_script or not ga4_script.string: raise ValueError("Could not find GA4 data.")
+
+    ga4_data = json.loads(ga4_script.string)
+    return {
+        "name": product_data.get('name'),
+        "serial_code": ga4_data.get('base_code'),
+        "store": "Koton",
+        "item_url": url,
+        "image_url": product_data.get('image', [None])[0]
+    }
+
+def time_per_page(parse, pages: list, repeat: int) -> list:
+    """CPU seconds per page parse, one sample per round over all pages."""
+    samples = []
+    for _ in range(repeat):
+        start = time.process_time()
+        for html_content in pages:
+            parse(html_content, "https://www.koton.com/fixture")
+        samples.append((time.process_time() - start) / len(pages))
+    return samples
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares the BeautifulSoup and regex product page parsers.")
+    parser.add_argument("pages", nargs="*", type=Path, default=[DEFAULT_FIXTURE], help="Saved product pages (HTML).")
+    parser.add_argument("--repeat", type=int, default=50, help="Rounds over all pages per parser.")
+    args = parser.parse_args()
+
+    parsers = (("beautifulsoup", parse_koton_product_soup), ("soup-strained", parse_koton_product_strained),
+               ("extractors", parse_koton_product))
+    pages = [path.read_text(encoding="utf-8") for path in args.pages]
+    for path, html_content in zip(args.pages, pages):
+        expected = parse_koton_product_soup(html_content, "https://www.koton.com/fixture")
+        if any(parse(html_content, "https://www.koton.com/fixture") != expected for _, parse in parsers[1:]):
+            raise SystemExit(f"❌ The parsers disagree on {path.name}.")
+    size_kb = sum(len(html_content.encode("utf-8")) for html_content in pages) / len(pages) / 1024
+    print(f"{len(pages)} pages, {size_kb:.0f} KB on average, {args.repeat} rounds.")
+
+    results = {}
+    for name, parse in parsers:
+        results[name] = statistics.median(time_per_page(parse, pages, args.repeat)) * 1000
+        print(f"{name:<14} {results[name]:>8.3f} ms CPU per page (median)")
+    print(f"Speed-up: {results['beautifulsoup'] / results['extractors']:.0f}x over the original full parse, "
+          f"{results['soup-strained'] / results['extractors']:.0f}x over the SoupStrainer parse")
@@ -0,0 +1,71 @@
+# scraper/bloom.py
+
+"""Client side of the backend's known-items Bloom filter (GET /items/known/{field}).
+
+Must stay bit-for-bit compatible with backend/bloom.py; `python bloom.py` checks that it does.
+A hit means "probably already in the database" (false positives at the requested error rate);
+a miss is always a new item.
+"""
+
+import hashlib
+import struct
+
+class BloomFilter:
+    """Bloom filter over strings, using double hashing of a single 128-bit BLAKE2b digest."""
+
+    # Magic, number of bits, number of hash functions.
+    HEADER = struct.Struct(">4sQI")
+    MAGIC = b"BLM1"
+
+    def __init__(self, size_bits: int, hash_count: int, bits: bytes = None):
+        self.size_bits = size_bits
+        self.hash_count = hash_count
+        self.bits = bytearray((size_bits + 7) // 8) if bits is None else bytearray(bits)
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.size_bits for i in range(self.hash_count))
+
+    def add(self, value: str):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BloomFilter":
+        magic, size_bits, hash_count = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC:
+            raise ValueError("Not a Bloom filter snapshot")
+        return cls(size_bits, hash_count, data[cls.HEADER.size:])
+
+if __name__ == "__main__":
+    # Round-trip check against the backend's implementation: python bloom.py
+    import importlib.util
+    import random
+    from pathlib import Path
+
+    spec = importlib.util.spec_from_file_location("backend_bloom", Path(__file__).parent.parent / "backend" / "bloom.py")
+    backend_bloom = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(backend_bloom)
+
+    members = [f"https://www.koton.com/p-{i}" for i in range(5000)] + ["", "çğıöşü", "1A2B3C"]
+    probes = members + [f"https://www.koton.com/q-{random.getrandbits(64)}" for _ in range(20000)]
+    for error_rate in (0.01, 0.0001):
+        served = backend_bloom.BloomFilter.for_capacity(len(members), error_rate)
+        for value in members:
+            served.add(value)
+        client = BloomFilter.from_bytes(served.to_bytes())
+        mismatches = [value for value in probes if (value in client) != (value in served)]
+        if mismatches:
+            raise SystemExit(f"❌ Membership differs from backend/bloom.py for {len(mismatches)} values, e.g. {mismatches[0]!r}.")
+        # Items added locally must set the same bits the backend would.
+        local = BloomFilter(served.size_bits, served.hash_count)
+        for value in members:
+            local.add(value)
+        if bytes(local.bits) != bytes(served.bits):
+            raise SystemExit("❌ Locally added values set different bits than backend/bloom.py.")
+    print(f"✅ scraper/bloom.py agrees with backend/bloom.py on {len(probes)} values.")
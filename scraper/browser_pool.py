@@ -0,0 +1,93 @@
+# scraper/browser_pool.py
+
+from typing import Optional
+
+from playwright.sync_api import Browser, BrowserContext, Page, Playwright
+
+from http_fetch import USER_AGENT
+from resource_blocking import DEFAULT_PROFILE, install_blocking
+
+# --- Pool Settings ---
+# A context is thrown away and recreated after this many pages...
+PAGES_PER_CONTEXT = 50
+# ...or as soon as the page's JS heap grows past this many megabytes.
+JS_HEAP_LIMIT_MB = 300
+# Every context sets its own proxy, so the proxy given at launch is only a placeholder.
+PER_CONTEXT_PROXY_PLACEHOLDER = {"server": "http://per-context"}
+
+class BrowserPool:
+    """Keeps one long-lived Chromium per worker and rotates proxies at the context level.
+
+    Switching proxies only costs a new browser context instead of a whole browser launch.
+    Contexts are recycled after PAGES_PER_CONTEXT pages or when their JS heap gets too big.
+    """
+
+    def __init__(self, playwright: Playwright, proxied: bool = True, pages_per_context: int = PAGES_PER_CONTEXT,
+                 heap_limit_mb: float = JS_HEAP_LIMIT_MB, headless: bool = True, block_profile: str = DEFAULT_PROFILE):
+        self.playwright = playwright
+        self.block_profile = block_profile
+        self.proxied = proxied
+        self.pages_per_context = pages_per_context
+        self.heap_limit_mb = heap_limit_mb
+        self.headless = headless
+        self.browser: Optional[Browser] = None
+        self.context: Optional[BrowserContext] = None
+        self.page: Optional[Page] = None
+        self.proxy: Optional[str] = None
+        self.pages_used = 0
+        self.launches = 0
+        self.contexts_created = 0
+
+    def _ensure_browser(self):
+        if self.browser and self.browser.is_connected():
+            return
+        launch_options = {"headless": self.headless}
+        if self.proxied:
+            launch_options["proxy"] = PER_CONTEXT_PROXY_PLACEHOLDER
+        self.browser = self.playwright.chromium.launch(**launch_options)
+        self.launches += 1
+
+    def open(self, proxy: Optional[str] = None) -> Page:
+        """Closes the current context and returns a page in a fresh context that uses the given proxy."""
+        self.discard()
+        self._ensure_browser()
+        context_options = {"user_agent": USER_AGENT}
+        if proxy:
+            context_options["proxy"] = {"server": proxy}
+        self.context = self.browser.new_context(**context_options)
+        install_blocking(self.context, self.block_profile)
+        self.page = self.context.new_page()
+        self.proxy = proxy
+        self.pages_used = 0
+        self.contexts_created += 1
+        return self.page
+
+    def _heap_mb(self) -> float:
+        try:
+            used = self.page.evaluate("() => (performance.memory && performance.memory.usedJSHeapSize) || 0")
+            return used / (1024 * 1024)
+        except Exception:
+            return 0.0
+
+    def page_done(self) -> Page:
+        """Call after every page. Recycles the context (same proxy) once it has served enough pages or grew too big."""
+        self.pages_used += 1
+        if self.pages_used >= self.pages_per_context or self._heap_mb() > self.heap_limit_mb:
+            print(f"♻️ Recycling browser context after {self.pages_used} pages.")
+            return self.open(self.proxy)
+        return self.page
+
+    def discard(self):
+        """Closes the current context, e.g. because its proxy failed. The browser stays up."""
+        if self.context:
+            try:
+                self.context.close()
+            except Exception:
+                pass
+        self.context, self.page, self.proxy = None, None, None
+
+    def close(self):
+        self.discard()
+        if self.browser and self.browser.is_connected():
+            self.browser.close()
+        self.browser = None
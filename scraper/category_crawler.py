@@ -0,0 +1,209 @@
+# scraper/category_crawler.py
+
+"""Discovers product URLs by walking Koton's category listings, and adds new ones to the work queue.
+
+Categories are walked concurrently through the async engine (so across the whole proxy pool),
+several pages of a category at a time. URLs we already know about (in the work queue, scraped
+according to the checkpoint store, or in the backend's item_url Bloom filter) are ignored; the rest
+are seeded into the queue as soon as their page is read, for workers started with --queue. Once a
+page turns up nothing but known URLs the rest of the category is assumed known too, unless --full.
+A first page without product links is rendered in the browser before the category counts as empty,
+in case the listing is built by JavaScript or the site answered with an empty shell; if the browser
+finds links there, the rest of the category is rendered too.
+Sale categories are always walked to the end: every product on them is recorded for the refresh
+scheduler, which checks their prices sooner.
+
+    python category_crawler.py
+    python category_crawler.py --full --categories https://www.koton.com/erkek-giyim/
+"""
+
+import argparse
+import asyncio
+import time
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, SoupStrainer
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from api_client import fetch_known_filter
+from async_engine import AsyncScrapeEngine, FetchError
+from checkpoint_store import CheckpointStore
+from http_fetch import is_captcha
+from koton_scraper import MASTER_PROXY_LIST_FILE, load_proxies
+from proxy_pool import ProxyPool
+from refresh_scheduler import SALE_CATEGORIES, SaleListings
+from resource_blocking import BLOCKING_PROFILES, CATEGORY_READY_SELECTOR, DEFAULT_PROFILE
+from work_queue import WorkQueue
+
+CATEGORIES_TO_SCRAPE = [
+    "https://www.koton.com/kadin-giyim/", "https://www.koton.com/kadin-koton-jeans/",
+    "https://www.koton.com/sezon-trendleri", "https://www.koton.com/kadin-abiye-davet/",
+    "https://www.koton.com/kadin-ic-giyim/", "https://www.koton.com/sportclub/",
+    "https://www.koton.com/kadin-ofis-stili/", "https://www.koton.com/kadin-aksesuar/",
+    "https://www.koton.com/genc-kadin-yeni-gelenler/", "https://www.koton.com/genc-kadin-cok-satanlar/",
+    "https://www.koton.com/genc-kadin-giyim/", "https://www.koton.com/coklu-paket-urunler-kadin/",
+    "https://www.koton.com/erkek-yeni-gelenler/", "https://www.koton.com/erkek-giyim/",
+    "https://www.koton.com/erkek-koton-jeans/", "https://www.koton.com/erkek-anasayfa",
+    "https://www.koton.com/erkek-pijama-ev-ve-ic-giyim/", "https://www.koton.com/erkek-spor-giyim/",
+    "https://www.koton.com/erkek-aksesuar/", "https://www.koton.com/indirim-anasayfa",
+    "https://www.koton.com/yuzde50-indirimli-urunler/",
+]
+
+# --- Crawl Settings ---
+KOTON_BASE_URL = "https://www.koton.com"
+CATEGORY_CONCURRENCY = 8   # Categories walked at the same time.
+PAGES_AHEAD = 3            # Pages of one category fetched at once.
+KNOWN_PAGES_TO_STOP = 1    # Pages in a row with only known URLs that end a category.
+MAX_PAGES = 500            # Safety net against listings that never run out.
+
+# Only links are kept when parsing a listing page. The class is checked afterwards: at parse time
+# the strainer sees class="... product-link" as one string.
+LINK_STRAINER = SoupStrainer('a')
+
+def extract_product_urls(html_content: str) -> list:
+    """Returns the absolute product URLs on a listing page, in page order and without duplicates."""
+    soup = BeautifulSoup(html_content, 'html.parser', parse_only=LINK_STRAINER)
+    urls = (urljoin(KOTON_BASE_URL, link['href']) for link in soup.find_all('a', class_='product-link', href=True))
+    return list(dict.fromkeys(urls))
+
+class CategoryCrawler:
+    """Walks category listings page by page and merges the product URLs it finds into the work queue."""
+
+    def __init__(self, engine: AsyncScrapeEngine, queue: WorkQueue, checkpoints: CheckpointStore,
+                 known_urls=None, pages_ahead: int = PAGES_AHEAD, known_pages_to_stop: int = KNOWN_PAGES_TO_STOP,
+                 max_pages: int = MAX_PAGES, sale_listings: SaleListings = None):
+        self.engine = engine
+        self.queue = queue
+        self.checkpoints = checkpoints
+        # Item URLs the backend probably has already (a Bloom filter), or None.
+        self.known_urls = known_urls
+        self.pages_ahead = pages_ahead
+        # 0 walks every category to its last page.
+        self.known_pages_to_stop = known_pages_to_stop
+        self.max_pages = max_pages
+        # Where products seen in the sale categories are recorded, or None.
+        self.sale_listings = sale_listings
+        # The SQLite stores are used from worker threads, one call at a time.
+        self.store_lock = asyncio.Lock()
+        # category URL -> {"pages": ..., "found": ..., "new": ..., "stopped": reason}
+        self.stats = {}
+
+    def merge(self, urls: list) -> int:
+        """Seeds the URLs nobody knows about yet into the queue. Returns how many were new."""
+        if self.known_urls is not None:
+            urls = [url for url in urls if url not in self.known_urls]
+        queued = self.queue.known(urls)
+        urls = self.checkpoints.remaining([url for url in urls if url not in queued])
+        return self.queue.seed(urls)
+
+    async def fetch_page(self, category_url: str, page_number: int, render: bool = False):
+        """Returns the product URLs on one listing page, or None if it could not be fetched.
+
+        With `render` the page is rendered in the browser instead of fetched over plain HTTP.
+        """
+        try:
+            if render:
+                html_content = await self.engine.render(f"{category_url}?page={page_number}")
+            else:
+                html_content = await self.engine.fetch(f"{category_url}?page={page_number}")
+        except PlaywrightTimeoutError:
+            # The browser waited for a product link that never appeared: the page has none.
+            return []
+        except FetchError as e:
+            print(f"❌ Could not fetch page {page_number} of {category_url}. Error: {e}")
+            return None
+        except Exception as e:
+            print(f"❌ Could not render page {page_number} of {category_url}. Error: {e.__class__.__name__}")
+            return None
+        if is_captcha(html_content):
+            print(f"❗ CAPTCHA on page {page_number} of {category_url}.")
+            return None
+        return extract_product_urls(html_content)
+
+    async def crawl_category(self, category_url: str):
+        stats = self.stats[category_url] = {"pages": 0, "found": 0, "new": 0, "stopped": "max pages"}
+        page_number, known_streak = 1, 0
+        # Set when the listing only shows its products in a browser; every page is rendered from then on.
+        render = False
+        on_sale = self.sale_listings is not None and category_url in SALE_CATEGORIES
+        while page_number <= self.max_pages:
+            # Page 1 is read on its own, as it decides whether the listing needs the browser.
+            ahead = self.pages_ahead if page_number > 1 else 1
+            numbers = range(page_number, min(page_number + ahead, self.max_pages + 1))
+            pages = await asyncio.gather(*(self.fetch_page(category_url, number, render) for number in numbers))
+            # Pages are handled in order, so anything fetched past the stopping page is simply dropped.
+            for number, urls in zip(numbers, pages):
+                if number == 1 and urls == [] and not render:
+                    # A JS-rendered listing or a soft block looks just like an empty category over plain HTTP.
+                    print(f"🧭 No product links on page 1 of {category_url}. Checking in the browser.")
+                    urls = await self.fetch_page(category_url, 1, render=True)
+                    render = bool(urls)
+                if urls is None:
+                    stats["stopped"] = f"fetch failed on page {number}"
+                    return
+                if not urls:
+                    stats["stopped"] = "end of listing"
+                    return
+                async with self.store_lock:
+                    new = await asyncio.to_thread(self.merge, urls)
+                    if on_sale:
+                        await asyncio.to_thread(self.sale_listings.mark, urls)
+                stats["pages"] += 1
+                stats["found"] += len(urls)
+                stats["new"] += new
+                print(f"{category_url} page {number}: {len(urls)} links, {new} new.")
+                known_streak = 0 if new else known_streak + 1
+                if not on_sale and self.known_pages_to_stop and known_streak >= self.known_pages_to_stop:
+                    stats["stopped"] = "only known URLs"
+                    return
+            page_number = numbers[-1] + 1
+
+    async def run(self, categories: list):
+        try:
+            await self.engine.run(categories, self.crawl_category)
+        finally:
+            await self.engine.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Finds new product URLs in Koton's categories and queues them.")
+    parser.add_argument("--categories", nargs="+", default=CATEGORIES_TO_SCRAPE,
+                        help="Category URLs to walk (default: every category we track).")
+    parser.add_argument("--concurrency", type=int, default=CATEGORY_CONCURRENCY, help="Categories walked at once.")
+    parser.add_argument("--pages-ahead", type=int, default=PAGES_AHEAD, help="Pages of a category fetched at once.")
+    parser.add_argument("--known-pages", type=int, default=KNOWN_PAGES_TO_STOP,
+                        help="Stop a category after this many pages in a row without a new URL.")
+    parser.add_argument("--full", action="store_true", help="Walk every page of every category.")
+    parser.add_argument("--max-pages", type=int, default=MAX_PAGES)
+    parser.add_argument("--block-profile", choices=sorted(BLOCKING_PROFILES), default=DEFAULT_PROFILE,
+                        help="Which images/fonts/trackers Playwright pages skip downloading.")
+    args = parser.parse_args()
+
+    if not MASTER_PROXY_LIST_FILE.exists():
+        print(f"❌ ERROR: Master proxy list '{MASTER_PROXY_LIST_FILE.name}' not found.")
+        exit()
+    proxy_pool = ProxyPool(load_proxies(MASTER_PROXY_LIST_FILE))
+    # Category pages never carry product data, so only a CAPTCHA sends them to the browser.
+    engine = AsyncScrapeEngine(proxy_pool, concurrency=args.concurrency, block_profile=args.block_profile,
+                               ready_selector=CATEGORY_READY_SELECTOR, gated=is_captcha)
+    queue = WorkQueue()
+    checkpoints = CheckpointStore()
+    sale_listings = SaleListings()
+    crawler = CategoryCrawler(engine, queue, checkpoints, known_urls=fetch_known_filter("item_url"),
+                              pages_ahead=args.pages_ahead, known_pages_to_stop=0 if args.full else args.known_pages,
+                              max_pages=args.max_pages, sale_listings=sale_listings)
+
+    print(f"--- Crawling {len(args.categories)} categories, {args.concurrency} at a time ---")
+    start_time = time.monotonic()
+    try:
+        asyncio.run(crawler.run(args.categories))
+    finally:
+        proxy_pool.save()
+        checkpoints.close()
+        sale_listings.close()
+
+    print(f"Pacing: {engine.limiter.summary()}")
+    for category_url, stats in crawler.stats.items():
+        print(f"{category_url}: {stats['pages']} pages, {stats['found']} links, {stats['new']} new ({stats['stopped']}).")
+    total_new = sum(stats["new"] for stats in crawler.stats.values())
+    print(f"\n--- ✅ Queued {total_new} new URLs in {time.monotonic() - start_time:.0f}s. Queue state: {queue.counts()} ---")
+    queue.close()
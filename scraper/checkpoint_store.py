@@ -0,0 +1,122 @@
+# scraper/checkpoint_store.py
+
+import sqlite3
+import time
+from pathlib import Path
+
+# --- File Definitions ---
+CHECKPOINT_DB_FILE = Path(__file__).parent / "scrape_checkpoints.db"
+# Text files used before the checkpoint store existed; they are imported once.
+LEGACY_SCRAPED_URLS_FILE = Path(__file__).parent / "scraped_urls.json"
+LEGACY_FAILED_URLS_FILE = Path(__file__).parent / "permanently_failed_urls.txt"
+
+# How many recorded outcomes are held in memory before they are committed together.
+COMMIT_BATCH_SIZE = 50
+
+class CheckpointStore:
+    """Per-URL scrape outcomes (status, attempts, last error, timestamp) in an indexed SQLite file.
+
+    The file is opened in WAL mode so several worker processes can record outcomes at the same time.
+    """
+
+    def __init__(self, path: Path = CHECKPOINT_DB_FILE, batch_size: int = COMMIT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.pending = []
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # WAL already survives crashes; NORMAL only gives up durability of the very last commits on power loss.
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                url TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 1,
+                last_error TEXT,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_checkpoints_status ON checkpoints (status)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._import_legacy_files()
+
+    def _import_legacy_files(self):
+        """Copies scraped_urls.json and permanently_failed_urls.txt into the store the first time it is opened."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self.conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+                self.conn.execute("COMMIT")
+                return
+            now = time.time()
+            for filepath, status in ((LEGACY_FAILED_URLS_FILE, "failed"), (LEGACY_SCRAPED_URLS_FILE, "done")):
+                if not filepath.exists():
+                    continue
+                with open(filepath, 'r') as f:
+                    # Later lines win, so a URL that failed once and was scraped later ends up as done.
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO checkpoints (url, status, updated_at) VALUES (?, ?, ?)",
+                        ((line.strip(), status, now) for line in f if line.strip()),
+                    )
+                print(f"Imported {filepath.name} into the checkpoint store.")
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported', ?)", (str(now),))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    # --- Recording ---
+    def record(self, url: str, status: str, error: str = None):
+        """Queues an outcome; it is committed with the next batch."""
+        self.pending.append((url, status, error, time.time()))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def mark_done(self, urls: list):
+        for url in urls:
+            self.record(url, "done")
+        self.flush()
+
+    def flush(self):
+        """Commits every queued outcome in one transaction."""
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.executemany("""
+            INSERT INTO checkpoints (url, status, last_error, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (url) DO UPDATE SET
+                status = CASE WHEN checkpoints.status = 'done' THEN 'done' ELSE excluded.status END,
+                attempts = checkpoints.attempts + 1,
+                last_error = COALESCE(excluded.last_error, checkpoints.last_error),
+                updated_at = excluded.updated_at
+        """, batch)
+        self.conn.execute("COMMIT")
+
+    # --- Queries ---
+    def is_done(self, url: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM checkpoints WHERE url = ? AND status = 'done'", (url,)).fetchone() is not None
+
+    def remaining(self, urls: list) -> list:
+        """Returns the URLs (in their original order) that have not been scraped successfully yet."""
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (url TEXT)")
+        self.conn.execute("DELETE FROM wanted")
+        self.conn.executemany("INSERT INTO wanted (url) VALUES (?)", ((url,) for url in urls))
+        # Each probe is a primary-key lookup, so this never builds the full set of scraped URLs.
+        rows = self.conn.execute("""
+            SELECT w.url FROM wanted w
+            WHERE NOT EXISTS (SELECT 1 FROM checkpoints c WHERE c.url = w.url AND c.status = 'done')
+            ORDER BY w.rowid
+        """).fetchall()
+        self.conn.execute("DELETE FROM wanted")
+        return [url for (url,) in rows]
+
+    def done_urls(self):
+        """Yields every URL recorded as done."""
+        for (url,) in self.conn.execute("SELECT url FROM checkpoints WHERE status = 'done'"):
+            yield url
+
+    def counts(self) -> dict:
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM checkpoints GROUP BY status").fetchall())
+
+    def close(self):
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,155 @@
+# scraper/conditional_fetch.py
+
+"""Price checks over plain HTTP that skip the work for product pages that did not change.
+
+For every item the last ETag / Last-Modified, a hash of the Product JSON-LD fragment (which
+carries the price) and the price read from it are kept in a local SQLite file. The next check
+sends a conditional request; a 304 means nothing was downloaded at all. Otherwise the fragment is
+sliced out of the page and hashed, and if the hash matches the last check the page is not parsed
+and the known price is reused. Pages that are CAPTCHA-gated or carry no usable fragment are left
+to the browser. A check's new state is only stored once its price has reached the backend (see
+ConditionalPriceChecker.commit), so a failed post is never mistaken for an unchanged page.
+"""
+
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from extractors import find_product_ld_json, loads_first
+from http_fetch import HttpFetcher
+
+# --- File Definitions ---
+PRICE_CHECK_STATE_FILE = Path(__file__).parent / "price_check_state.db"
+
+def price_from_fragment(fragment: str) -> float:
+    """Reads offers.price from a Product JSON-LD fragment. Raises ValueError if there is none."""
+    product = loads_first(fragment)
+    if not isinstance(product, dict):
+        raise ValueError("Product JSON-LD is not an object.")
+    offers = product.get("offers")
+    if isinstance(offers, list):
+        offers = offers[0] if offers else None
+    if not isinstance(offers, dict) or offers.get("price") in (None, ""):
+        raise ValueError("Product JSON-LD has no offers.price.")
+    price = offers["price"]
+    return float(price) if isinstance(price, (int, float)) else float(str(price).replace(',', '.'))
+
+class PriceCheck(NamedTuple):
+    price: Optional[float]
+    # True when the page is known not to have changed since the last check (304 or same fragment).
+    unchanged: bool
+    # True when the page has to be checked with a browser instead.
+    needs_browser: bool
+
+class PriceCheckStore:
+    """Per-item validators, fragment hash and price of the last HTTP price check, in a local SQLite file."""
+
+    def __init__(self, path: Path = PRICE_CHECK_STATE_FILE):
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS price_checks (
+                item_id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fragment_hash TEXT NOT NULL,
+                price REAL NOT NULL,
+                body_bytes INTEGER NOT NULL,
+                checked_at REAL NOT NULL
+            )
+        """)
+
+    def get(self, item_id: int) -> Optional[sqlite3.Row]:
+        return self.conn.execute("SELECT * FROM price_checks WHERE item_id = ?", (item_id,)).fetchone()
+
+    def save(self, item_id: int, url: str, etag: Optional[str], last_modified: Optional[str],
+             fragment_hash: str, price: float, body_bytes: int):
+        self.conn.execute("""
+            INSERT OR REPLACE INTO price_checks
+                (item_id, url, etag, last_modified, fragment_hash, price, body_bytes, checked_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (item_id, url, etag, last_modified, fragment_hash, price, body_bytes, time.time()))
+
+    def close(self):
+        self.conn.close()
+
+class SweepStats:
+    """What conditional requests and fragment hashes saved during one sweep."""
+
+    def __init__(self):
+        self.checks = 0
+        self.not_modified = 0
+        self.unchanged_fragments = 0
+        self.bytes_downloaded = 0
+        self.bytes_saved = 0
+        self.parses_saved = 0
+
+    def summary(self) -> str:
+        return (f"{self.checks} HTTP checks: {self.not_modified} not modified, {self.unchanged_fragments} unchanged fragments; "
+                f"{self.bytes_downloaded / 1024 / 1024:.1f} MB downloaded, {self.bytes_saved / 1024 / 1024:.1f} MB saved, "
+                f"{self.parses_saved} parses skipped")
+
+class ConditionalPriceChecker:
+    """Checks item prices with conditional requests, reusing the last price whenever the page is unchanged."""
+
+    def __init__(self, fetcher: HttpFetcher, store: PriceCheckStore):
+        self.fetcher = fetcher
+        self.store = store
+        self.stats = SweepStats()
+        # New state per item id, kept back until commit() confirms the price reached the backend.
+        self.staged = {}
+
+    def commit(self, item_ids):
+        """Stores the staged state of `item_ids`, whose prices the backend has accepted."""
+        for item_id in item_ids:
+            state = self.staged.pop(item_id, None)
+            if state is not None:
+                self.store.save(item_id, *state)
+
+    def check(self, item: dict) -> PriceCheck:
+        """Checks one item's price. Network errors are raised as requests exceptions."""
+        item_id, url = item["id"], item["item_url"]
+        state = self.store.get(item_id)
+        if state is not None and state["url"] != url:
+            state = None
+        headers = {}
+        if state is not None:
+            if state["etag"]:
+                headers["If-None-Match"] = state["etag"]
+            if state["last_modified"]:
+                headers["If-Modified-Since"] = state["last_modified"]
+
+        self.stats.checks += 1
+        result = self.fetcher.fetch(url, headers=headers)
+        if result.status_code == 304 and state is not None:
+            self.stats.not_modified += 1
+            self.stats.bytes_saved += state["body_bytes"]
+            self.stats.parses_saved += 1
+            self.staged[item_id] = (url, state["etag"], state["last_modified"], state["fragment_hash"],
+                                    state["price"], state["body_bytes"])
+            return PriceCheck(state["price"], True, False)
+        self.stats.bytes_downloaded += result.size
+        if result.needs_browser:
+            return PriceCheck(None, False, True)
+
+        fragment = find_product_ld_json(result.html)
+        if fragment is None:
+            return PriceCheck(None, False, True)
+        fragment_hash = hashlib.blake2b(fragment.encode("utf-8"), digest_size=16).hexdigest()
+        etag, last_modified = result.headers.get("ETag"), result.headers.get("Last-Modified")
+        if state is not None and state["fragment_hash"] == fragment_hash:
+            self.stats.unchanged_fragments += 1
+            self.stats.parses_saved += 1
+            self.staged[item_id] = (url, etag, last_modified, fragment_hash, state["price"], result.size)
+            return PriceCheck(state["price"], True, False)
+        try:
+            price = price_from_fragment(fragment)
+        except ValueError:
+            return PriceCheck(None, False, True)
+        self.staged[item_id] = (url, etag, last_modified, fragment_hash, price, result.size)
+        return PriceCheck(price, False, False)
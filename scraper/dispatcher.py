@@ -1,8 +1,11 @@
 # scraper/dispatcher.py
 
 import json
+import argparse
 from pathlib import Path
 import math
+from work_queue import WorkQueue
+from checkpoint_store import CheckpointStore
 
 # --- CONFIGURATION ---
 # Set how many parallel workers you want to run.
@@ -12,6 +15,26 @@ TOTAL_WORKERS = 6
 ALL_URLS_FILE = Path(__file__).parent / "all_urls.json"
 MASTER_PROXY_LIST_FILE = Path(__file__).parent / "master_proxy_list.txt" # Your big list of 1000+ proxies
 
+def seed_work_queue():
+    """Loads all_urls.json into the shared work queue. Workers started with --queue lease from it."""
+    print("--- Seeding Work Queue ---")
+    all_urls = []
+    if ALL_URLS_FILE.exists():
+        with open(ALL_URLS_FILE, 'r') as f:
+            all_urls = json.load(f)
+    else:
+        print(f"No '{ALL_URLS_FILE.name}' found; run category_crawler.py to discover URLs into the queue.")
+
+    queue = WorkQueue()
+    # URLs finished in earlier runs go in as done so nobody scrapes them again.
+    checkpoints = CheckpointStore()
+    done = queue.seed(checkpoints.done_urls(), state="done")
+    checkpoints.close()
+    print(f"Recorded {done} previously scraped URLs as done.")
+    added = queue.seed(all_urls)
+    print(f"Added {added} new URLs to the queue. Current state: {queue.counts()}")
+    queue.close()
+
 def run_dispatcher():
     print("--- Starting Dispatcher ---")
 
@@ -61,4 +84,12 @@ def run_dispatcher():
     print("\n--- Dispatcher finished. Work files created. ---")
 
 if __name__ == "__main__":
-    run_dispatcher()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Splits the URL list between scraper workers.")
+    parser.add_argument("--queue", action="store_true",
+                        help="Seed the shared work queue instead of writing fixed per-worker files.")
+    args = parser.parse_args()
+
+    if args.queue:
+        seed_work_queue()
+    else:
+        run_dispatcher()
\ No newline at end of file
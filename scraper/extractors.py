@@ -0,0 +1,63 @@
+# scraper/extractors.py
+
+"""Pulls the Product JSON-LD and GA4 payloads out of a Koton product page without building a DOM.
+
+Both payloads are located with precompiled regexes and decoded straight from the matched slice,
+with orjson when it is installed and the standard library's raw_decode otherwise. This replaces a
+BeautifulSoup parse of the whole page plus a character-by-character brace scan of the JSON-LD
+(see bench_extract.py for the difference).
+"""
+
+import html
+import json
+import re
+from typing import Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LD_JSON_SCRIPT_RE = re.compile(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.S | re.I)
+GA4_PRODUCT_RE = re.compile(r'<div[^>]*class=["\'](?:[^"\']*\s)?js-ga4-product(?:\s[^"\']*)?["\'][^>]*>(.*?)</div>', re.S | re.I)
+PRODUCT_TYPE_MARKER = '"@type": "Product"'
+
+_decoder = json.JSONDecoder()
+
+def loads_first(text: str):
+    """Decodes the first JSON object in `text`, ignoring anything around it. Raises ValueError."""
+    start = text.find('{')
+    if start == -1:
+        raise ValueError("No JSON object found.")
+    if orjson is not None:
+        try:
+            return orjson.loads(text[start:].rstrip())
+        except orjson.JSONDecodeError:
+            # Trailing text after the object; let raw_decode find where it ends.
+            pass
+    return _decoder.raw_decode(text, start)[0]
+
+def find_product_ld_json(html_content: str) -> Optional[str]:
+    """Returns the text of the Product JSON-LD script, or None."""
+    for match in LD_JSON_SCRIPT_RE.finditer(html_content):
+        if PRODUCT_TYPE_MARKER in match.group(1):
+            return match.group(1).strip()
+    return None
+
+def extract_product_ld_json(html_content: str) -> dict:
+    fragment = find_product_ld_json(html_content)
+    if fragment is None:
+        raise ValueError("Could not find/parse Product JSON-LD.")
+    return loads_first(fragment)
+
+def extract_ga4_product(html_content: str) -> dict:
+    """Decodes the JSON inside the first div.js-ga4-product. Raises ValueError if it is missing."""
+    match = GA4_PRODUCT_RE.search(html_content)
+    # A payload with markup in it is not the plain JSON text node we expect.
+    if not match or not match.group(1).strip() or '<' in match.group(1):
+        raise ValueError("Could not find GA4 data.")
+    payload = match.group(1)
+    # Unlike a <script>, the div's text may carry HTML entities.
+    if '&' in payload:
+        payload = html.unescape(payload)
+    return loads_first(payload)
@@ -0,0 +1,97 @@
+# scraper/http_fetch.py
+
+from typing import Mapping, NamedTuple, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import RateLimiter
+
+# --- Fetch Settings ---
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36'
+# Text Koton shows on its bot check page.
+CAPTCHA_MARKER = "İnsan olduğunuzu doğrulayalım"
+# Markers that prove the server-rendered product data made it into the HTML.
+PRODUCT_MARKERS = ("application/ld+json", "js-ga4-product")
+# Status codes Koton answers with when it wants us to slow down.
+PUSHBACK_STATUS_CODES = (403, 429)
+
+class FetchResult(NamedTuple):
+    status_code: int
+    html: str
+    # True when the page is a CAPTCHA or does not carry the server-rendered product data.
+    needs_browser: bool
+    headers: Mapping[str, str] = {}
+    # Size of the (decompressed) response body.
+    size: int = 0
+
+def is_captcha(html: str) -> bool:
+    return CAPTCHA_MARKER in html
+
+def is_pushback(status_code: int, html: str) -> bool:
+    """Returns True if the response tells us to slow down: a 403/429 or the CAPTCHA page."""
+    return status_code in PUSHBACK_STATUS_CODES or is_captcha(html)
+
+def needs_browser(html: str) -> bool:
+    """Returns True if the HTML is a CAPTCHA page or is missing the product data we parse."""
+    if is_captcha(html):
+        return True
+    return not all(marker in html for marker in PRODUCT_MARKERS)
+
+class HttpFetcher:
+    """Fetches pages over plain HTTP, keeping one pooled keep-alive session per proxy."""
+
+    def __init__(self, pool_size: int = 10, timeout: float = 20, limiter: RateLimiter = None):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        # Told whether each response was healthy or a push back, if given. Callers wait on it before fetching.
+        self.limiter = limiter
+        self.sessions = {}
+
+    def _session_for(self, proxy: Optional[str]) -> requests.Session:
+        session = self.sessions.get(proxy)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({
+                "User-Agent": USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml",
+                "Accept-Language": "tr-TR,tr;q=0.9,en;q=0.8",
+            })
+            if proxy:
+                session.proxies = {"http": proxy, "https": proxy}
+            self.sessions[proxy] = session
+        return session
+
+    def fetch(self, url: str, proxy: Optional[str] = None, headers: dict = None) -> FetchResult:
+        """Downloads a page. Network and proxy errors are raised as requests exceptions.
+
+        `headers` are sent on top of the session's, e.g. If-None-Match for a conditional request;
+        a 304 answer comes back with an empty html and needs_browser=False.
+        """
+        try:
+            response = self._session_for(proxy).get(url, timeout=self.timeout, headers=headers)
+        except requests.exceptions.Timeout:
+            if self.limiter:
+                self.limiter.record(url, proxy, throttled=True)
+            raise
+        html = response.text
+        if self.limiter:
+            self.limiter.record(url, proxy, throttled=is_pushback(response.status_code, html))
+        if response.status_code == 304:
+            return FetchResult(304, html, False, response.headers, 0)
+        gated = response.status_code in PUSHBACK_STATUS_CODES or needs_browser(html)
+        return FetchResult(response.status_code, html, gated, response.headers, len(response.content))
+
+    def drop(self, proxy: Optional[str]):
+        """Closes the pooled connections of a proxy that stopped working."""
+        session = self.sessions.pop(proxy, None)
+        if session:
+            session.close()
+
+    def close(self):
+        for session in self.sessions.values():
+            session.close()
+        self.sessions.clear()
@@ -4,18 +4,28 @@ import json
 import re
 import requests
 import time
-import random
 import datetime
-import sys
+import argparse
+import asyncio
 from pathlib import Path
-from bs4 import BeautifulSoup
 from playwright.sync_api import sync_playwright, Page, TimeoutError as PlaywrightTimeoutError
+from api_client import API_URL, ItemBuffer, fetch_known_filter
+from extractors import extract_ga4_product, extract_product_ld_json
+from http_fetch import HttpFetcher
+from async_engine import AsyncScrapeEngine, FetchError, DEFAULT_CONCURRENCY
+from work_queue import WorkQueue
+from checkpoint_store import CheckpointStore
+from proxy_pool import ProxyPool
+from rate_limiter import RateLimiter
+from browser_pool import BrowserPool
+from resource_blocking import BLOCKING_PROFILES, DEFAULT_PROFILE, PRODUCT_READY_SELECTOR, format_transfer_stats
 
 # --- File Definitions ---
-API_URL = "http://127.0.0.1:8000"
 USER_DATA_DIR = Path(__file__).parent / "browser_data"
-SCRAPED_URLS_FILE = Path(__file__).parent / "scraped_urls.json"
-PERMANENTLY_FAILED_URLS_FILE = Path(__file__).parent / "permanently_failed_urls.txt"
+MASTER_PROXY_LIST_FILE = Path(__file__).parent / "master_proxy_list.txt"
+
+# How many proxies are tried for a single URL before it counts as failed.
+MAX_PROXY_ATTEMPTS = 8
 
 def save_item_to_db(item_data: dict) -> bool:
     """Saves item to the database via the API. Returns True on success."""
@@ -42,147 +52,329 @@ def save_item_to_db(item_data: dict) -> bool:
         print(f"❌ Error saving to DB: {e}")
     return False
 
-def find_first_json_object(text: str):
-    """Safely extracts the first complete JSON object from a string."""
-    open_braces, start_index = 0, -1
-    for i, char in enumerate(text):
-        if char == '{':
-            if start_index == -1: start_index = i
-            open_braces += 1
-        elif char == '}':
-            open_braces -= 1
-            if open_braces == 0 and start_index != -1:
-                return text[start_index:i+1]
-    return None
-
-def scrape_koton_product(page: Page, url: str) -> bool:
-    """Scrapes a single product page. Returns True on success."""
+def parse_koton_product(html_content: str, url: str) -> dict:
+    """Builds the item payload from a product page's JSON-LD and GA4 blobs. Raises ValueError if they are missing."""
+    product_data = extract_product_ld_json(html_content)
+    ga4_data = extract_ga4_product(html_content)
+    serial_code = ga4_data.get('base_code')
+
+    return {
+        "name": product_data.get('name'), 
+        "serial_code": serial_code, 
+        "store": "Koton", 
+        "item_url": url,
+        "image_url": product_data.get('image', [None])[0]
+    }
+
+def save_scraped_item(scraped_item: dict, item_buffer: ItemBuffer = None) -> bool:
+    """Queues the item on the buffer if there is one, otherwise saves it right away."""
+    if item_buffer is not None:
+        return item_buffer.add(scraped_item)
+    return save_item_to_db(scraped_item)
+
+def scrape_koton_product(page: Page, url: str, item_buffer: ItemBuffer = None,
+                         limiter: RateLimiter = None, proxy: str = None) -> bool:
+    """Scrapes a single product page. Returns True on success.
+
+    With an item_buffer the item is queued for a bulk save instead of being saved right away.
+    With a limiter the outcome is recorded for the page's host and `proxy`.
+    """
     try:
-        page.goto(url, wait_until="networkidle", timeout=30000)
-        html_content = page.content()
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        product_data = None
-        scripts = soup.find_all('script', type='application/ld+json')
-        for script in scripts:
-            if script.string and '"@type": "Product"' in script.string:
-                json_string = find_first_json_object(script.string)
-                if json_string:
-                    product_data = json.loads(json_string)
-                    break
-        if not product_data: raise ValueError("Could not find/parse Product JSON-LD.")
-
-        ga4_script = soup.find('div', class_='js-ga4-product')
-        if not ga4_script or not ga4_script.string: raise ValueError("Could not find GA4 data.")
-        
-        ga4_data = json.loads(ga4_script.string)
-        serial_code = ga4_data.get('base_code')
-
-        scraped_item = {
-            "name": product_data.get('name'), 
-            "serial_code": serial_code, 
-            "store": "Koton", 
-            "item_url": url,
-            "image_url": product_data.get('image', [None])[0]
-        }
-        return save_item_to_db(scraped_item)
+        # Resolve once the GA4 blob (which comes after the JSON-LD) is in the DOM instead of at network idle.
+        page.goto(url, wait_until="commit", timeout=30000)
+        page.wait_for_selector(PRODUCT_READY_SELECTOR, state="attached", timeout=30000)
+        if limiter:
+            limiter.record(url, proxy)
+        scraped_item = parse_koton_product(page.content(), url)
+        return save_scraped_item(scraped_item, item_buffer)
     except Exception as e:
+        # A CAPTCHA page never renders the product data, so it shows up here as a timeout.
+        if limiter and isinstance(e, PlaywrightTimeoutError):
+            limiter.record(url, proxy, throttled=True)
         print(f"❌ Scrape failed for {url}. Error: {e.__class__.__name__}")
         return False
 
-# NOTE: The crawl_koton_category function is no longer used by the main execution block of this script,
-# but it is kept here in case you need to generate a new all_urls.json file.
-def crawl_koton_category(page: Page, category_url: str):
-    print(f"\n{'='*20}\nCrawling: {category_url}\n{'='*20}")
-    # ... (function code is the same as previous versions) ...
+def scrape_koton_product_http(fetcher: HttpFetcher, url: str, proxy: str, item_buffer: ItemBuffer = None):
+    """Scrapes a product page over plain HTTP.
 
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python koton_scraper.py <worker_id>")
-        sys.exit(1)
-    
-    worker_id = sys.argv[1]
-    print(f"--- Starting Worker #{worker_id} ---")
-
-    # Worker loads its specific, pre-assigned work files
-    urls_file = Path(__file__).parent / f"urls_worker_{worker_id}.json"
-    proxies_file = Path(__file__).parent / f"proxies_worker_{worker_id}.txt"
-
-    if not urls_file.exists() or not proxies_file.exists():
-        print(f"❌ ERROR: Work files for worker {worker_id} not found. Please run dispatcher.py first.")
-        exit()
+    Returns True on success, False if the request failed (likely a bad proxy),
+    or None if the page is a CAPTCHA/JS-gated and needs a real browser.
+    """
+    try:
+        result = fetcher.fetch(url, proxy)
+    except Exception as e:
+        print(f"❌ HTTP fetch failed for {url}. Error: {e.__class__.__name__}")
+        fetcher.drop(proxy)
+        return False
+    if result.needs_browser:
+        return None
+    try:
+        scraped_item = parse_koton_product(result.html, url)
+    except Exception as e:
+        print(f"❌ Could not parse {url} from plain HTML. Error: {e.__class__.__name__}")
+        return None
+    return save_scraped_item(scraped_item, item_buffer)
 
-    with open(urls_file, 'r') as f:
-        urls_to_process = json.load(f)
-    
-    with open(proxies_file, 'r') as f:
-        raw_proxies = [line.strip() for line in f if line.strip()]
+async def scrape_koton_product_async(engine: AsyncScrapeEngine, url: str, item_buffer: ItemBuffer, buffer_lock: asyncio.Lock) -> bool:
+    """Async version of scrape_koton_product built on the engine. Returns True on success."""
+    try:
+        html_content = await engine.fetch(url)
+        scraped_item = parse_koton_product(html_content, url)
+    except (FetchError, ValueError) as e:
+        print(f"❌ Scrape failed for {url}. Error: {e.__class__.__name__}")
+        return False
+    # The buffer flushes through a blocking API call, so it runs off the event loop, one flush at a time.
+    async with buffer_lock:
+        return await asyncio.to_thread(item_buffer.add, scraped_item)
 
-    # Format proxies to include protocol if missing
-    working_proxies = []
-    for p in raw_proxies:
-        if '://' not in p:
-            working_proxies.append(f"http://{p}")
-        else:
-            working_proxies.append(p)
-    
-    print(f"Worker #{worker_id} loaded {len(urls_to_process)} URLs and {len(working_proxies)} proxies.")
-    
-    # Load previously scraped URLs to avoid re-scraping in case of a restart
-    scraped_urls = set()
-    if SCRAPED_URLS_FILE.exists():
-        with open(SCRAPED_URLS_FILE, 'r') as f: scraped_urls = {line.strip() for line in f}
+def run_worker_sync(worker_id: str, urls_to_do, total: int, proxy_pool: ProxyPool, item_buffer: ItemBuffer,
+                    fetch_mode: str, on_failed, block_profile: str = DEFAULT_PROFILE):
+    """Scrapes the URLs one at a time, rotating proxies whenever a scrape fails."""
+    # Replaces a fixed pause between items: speeds up while the site answers normally, backs off when it pushes back.
+    limiter = RateLimiter()
+    fetcher = HttpFetcher(limiter=limiter) if fetch_mode == "http" else None
 
     with sync_playwright() as p:
-        browser, context, page = None, None, None
-        
-        # Filter out URLs that have already been scraped
-        urls_to_do = [url for url in urls_to_process if url not in scraped_urls]
+        # One Chromium for the whole run; proxies are switched by opening a new context.
+        browser_pool = BrowserPool(p, block_profile=block_profile)
         
         for i, url in enumerate(urls_to_do, 1):
-            print(f"\n[Worker #{worker_id}] Processing item {i}/{len(urls_to_do)}")
+            print(f"\n[Worker #{worker_id}] Processing item {i}/{total} ({proxy_pool.summary()})")
             scraped_successfully = False
+            needs_browser = fetcher is None
             
             # This loop tries different proxies for the same URL if one fails
-            for attempt in range(len(working_proxies) + 1):
-                if not browser or not browser.is_connected():
-                    if not working_proxies:
-                        print(f"[Worker #{worker_id}] 🚫 Ran out of working proxies for this worker.")
+            for attempt in range(MAX_PROXY_ATTEMPTS):
+                if not needs_browser:
+                    current_proxy = proxy_pool.acquire()
+                    if current_proxy is None:
+                        print(f"[Worker #{worker_id}] 🚫 Every proxy is quarantined right now.")
+                        break
+                    # Waited out before the clock starts so pacing does not count as proxy latency.
+                    limiter.wait(url, current_proxy)
+                    start_time = time.monotonic()
+                    result = scrape_koton_product_http(fetcher, url, current_proxy, item_buffer)
+                    if result:
+                        proxy_pool.report_success(current_proxy, time.monotonic() - start_time)
+                        scraped_successfully = True
+                        break
+                    if result is False:
+                        print(f"[Worker #{worker_id}] ...Proxy {current_proxy} failed over HTTP. Trying a new one.")
+                        proxy_pool.report_failure(current_proxy)
+                        continue
+                    print(f"[Worker #{worker_id}] 🧭 Page needs a browser. Falling back to Playwright.")
+                    needs_browser = True
+
+                if browser_pool.page is None:
+                    browser_proxy = proxy_pool.acquire()
+                    if browser_proxy is None:
+                        print(f"[Worker #{worker_id}] 🚫 Every proxy is quarantined right now.")
                         break # Exit the retry loop for this URL
                     
-                    current_proxy = random.choice(working_proxies)
-                    proxy_settings = {"server": current_proxy}
-                    
-                    print(f"[Worker #{worker_id}] 🔄 Starting new browser with proxy: {current_proxy}")
+                    print(f"[Worker #{worker_id}] 🔄 Opening new browser context with proxy: {browser_proxy}")
                     
                     try:
-                        browser = p.chromium.launch(headless=True, proxy=proxy_settings)
-                        context = browser.new_context(user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36')
-                        page = context.new_page()
+                        browser_pool.open(browser_proxy)
                     except Exception as e:
-                        print(f"❌ Failed to launch browser with {current_proxy}. Removing it. Error: {e}")
-                        working_proxies.remove(current_proxy)
-                        if browser: browser.close()
+                        print(f"❌ Failed to open a context with {browser_proxy}. Quarantining it. Error: {e}")
+                        proxy_pool.report_failure(browser_proxy)
+                        browser_pool.discard()
                         continue # Try the next proxy
 
                 # Attempt to scrape the URL
-                success = scrape_koton_product(page, url)
+                limiter.wait(url, browser_pool.proxy)
+                start_time = time.monotonic()
+                success = scrape_koton_product(browser_pool.page, url, item_buffer, limiter, browser_pool.proxy)
 
                 if success:
+                    proxy_pool.report_success(browser_pool.proxy, time.monotonic() - start_time)
+                    browser_pool.page_done()
                     scraped_successfully = True
-                    with open(SCRAPED_URLS_FILE, 'a') as f: f.write(f"{url}\n")
                     break # Success! Move to the next URL.
                 else:
-                    print(f"[Worker #{worker_id}] ...Current proxy {current_proxy} may be bad. Trying a new one.")
-                    browser.close() # Close browser to force a new one with a new proxy
-                    if current_proxy in working_proxies:
-                        working_proxies.remove(current_proxy)
+                    print(f"[Worker #{worker_id}] ...Current proxy {browser_pool.proxy} may be bad. Trying a new one.")
+                    proxy_pool.report_failure(browser_pool.proxy)
+                    browser_pool.discard() # Drop the context so the next attempt gets a new proxy
 
             if not scraped_successfully:
-                print(f"❌ All proxies for this worker failed for URL: {url}. Logging to permanently_failed_urls.txt")
-                with open(PERMANENTLY_FAILED_URLS_FILE, 'a') as f: f.write(f"{url}\n")
-            
-            time.sleep(random.uniform(1, 2))
+                print(f"❌ No proxy could scrape URL: {url}.")
+                on_failed(url, "All proxy attempts failed")
+
+        print(f"[Worker #{worker_id}] Browser launches: {browser_pool.launches}, contexts opened: {browser_pool.contexts_created}")
+        print(f"[Worker #{worker_id}] Pacing: {limiter.summary()}")
+        browser_pool.close()
+    if fetcher: fetcher.close()
+
+async def run_worker_async(worker_id: str, url_batches, total: int, proxy_pool: ProxyPool, item_buffer: ItemBuffer,
+                           concurrency: int, on_failed, block_profile: str = DEFAULT_PROFILE):
+    """Scrapes batches of URLs with up to `concurrency` fetches in flight from this single process.
+
+    The item buffer is flushed after every batch so a batch is fully saved before the next one starts.
+    """
+    engine = AsyncScrapeEngine(proxy_pool, concurrency=concurrency, block_profile=block_profile)
+    buffer_lock = asyncio.Lock()
+    done = 0
+
+    async def handle_url(url: str):
+        nonlocal done
+        if not await scrape_koton_product_async(engine, url, item_buffer, buffer_lock):
+            print(f"❌ [Worker #{worker_id}] Giving up on {url}.")
+            # Shares the buffer lock so checkpoint/queue writes never overlap with a flush running in a thread.
+            async with buffer_lock:
+                await asyncio.to_thread(on_failed, url, "Fetch or parse failed")
+        done += 1
+        if done % 100 == 0:
+            print(f"[Worker #{worker_id}] Processed {done}/{total} items ({proxy_pool.summary()}).")
+
+    try:
+        for batch in url_batches:
+            await engine.run(batch, handle_url)
+            async with buffer_lock:
+                await asyncio.to_thread(item_buffer.flush)
+    finally:
+        print(f"[Worker #{worker_id}] Pacing: {engine.limiter.summary()}")
+        await engine.close()
+
+def leased_batches(queue: WorkQueue, worker_id: str, lease_size: int):
+    """Yields batches leased from the shared work queue until it runs dry."""
+    while True:
+        batch = queue.lease(worker_id, lease_size)
+        if not batch:
+            return
+        yield batch
+
+def skip_known_urls(url_batches, known_urls, on_known):
+    """Drops URLs the backend probably has already from each batch, without fetching them.
+
+    The skipped URLs are passed to `on_known` so they are checkpointed like scraped ones.
+    """
+    for batch in url_batches:
+        known = [url for url in batch if url in known_urls]
+        if known:
+            on_known(known)
+            print(f"-> Skipping {len(known)} URLs already in the database.")
+        yield [url for url in batch if url not in known_urls]
+
+def load_proxies(filepath: Path) -> list:
+    """Loads a proxy list file, adding the http:// protocol where it is missing."""
+    with open(filepath, 'r') as f:
+        raw_proxies = [line.strip() for line in f if line.strip()]
+    return [p if '://' in p else f"http://{p}" for p in raw_proxies]
+
+# New product URLs are found by category_crawler.py, which adds them straight to the work queue.
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Koton product scraper worker.")
+    parser.add_argument("worker_id")
+    parser.add_argument("--fetch-mode", choices=["browser", "http"], default=None,
+                        help="'http' fetches pages without a browser and only falls back to Playwright for CAPTCHA/JS-gated pages. "
+                             "Default 'browser'; the async engine always works this way and only accepts 'http'.")
+    parser.add_argument("--engine", choices=["sync", "async"], default="sync",
+                        help="'async' keeps many fetches in flight from this one process.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Fetches in flight when using the async engine.")
+    parser.add_argument("--block-profile", choices=sorted(BLOCKING_PROFILES), default=DEFAULT_PROFILE,
+                        help="Which images/fonts/trackers Playwright pages skip downloading.")
+    parser.add_argument("--queue", action="store_true",
+                        help="Lease URLs from the shared work queue (seeded by 'dispatcher.py --queue') instead of a fixed work file.")
+    parser.add_argument("--lease-size", type=int, default=None,
+                        help="URLs leased per batch in queue mode.")
+    parser.add_argument("--skip-known-urls", action="store_true",
+                        help="Discovery runs: don't fetch URLs the backend already has (checked against a Bloom filter).")
+    args = parser.parse_args()
+    if args.engine == "async" and args.fetch_mode == "browser":
+        parser.error("--engine async always fetches over HTTP first; it cannot be combined with --fetch-mode browser.")
+    args.fetch_mode = args.fetch_mode or "browser"
+
+    worker_id = args.worker_id
+    print(f"--- Starting Worker #{worker_id} ---")
+    queue = None
+
+    checkpoints = CheckpointStore()
+
+    def mark_urls_scraped(urls: list):
+        # URLs are only marked once the backend has confirmed the batch they were saved in.
+        checkpoints.mark_done(urls)
+        if queue:
+            queue.complete(urls)
+
+    def handle_failed(url: str, reason: str):
+        # In queue mode a failed URL goes back to the pool until it runs out of attempts.
+        if queue and not queue.fail(url):
+            checkpoints.record(url, "retrying", reason)
+            return
+        print(f"-> Recording {url} as permanently failed.")
+        checkpoints.record(url, "failed", reason)
+
+    def mark_urls_conflicting(urls: list):
+        # The backend keeps refusing these (their serial code belongs to another URL), so retrying is pointless.
+        for url in urls:
+            if queue:
+                queue.fail(url, max_attempts=0)
+            checkpoints.record(url, "failed", "Serial code belongs to another item URL")
+        checkpoints.flush()
+
+    if args.queue:
+        # Every queue worker shares the master proxy list and pulls work until the queue is empty.
+        if not MASTER_PROXY_LIST_FILE.exists():
+            print(f"❌ ERROR: Master proxy list '{MASTER_PROXY_LIST_FILE.name}' not found.")
+            exit()
+        working_proxies = load_proxies(MASTER_PROXY_LIST_FILE)
+        queue = WorkQueue()
+        total = queue.counts().get("pending", 0)
+        lease_size = args.lease_size or (args.concurrency * 4 if args.engine == "async" else 25)
+        url_batches = leased_batches(queue, worker_id, lease_size)
+        print(f"Worker #{worker_id} is leasing from a queue with {total} pending URLs, using {len(working_proxies)} proxies.")
+    else:
+        # Worker loads its specific, pre-assigned work files
+        urls_file = Path(__file__).parent / f"urls_worker_{worker_id}.json"
+        proxies_file = Path(__file__).parent / f"proxies_worker_{worker_id}.txt"
+
+        if not urls_file.exists() or not proxies_file.exists():
+            print(f"❌ ERROR: Work files for worker {worker_id} not found. Please run dispatcher.py first.")
+            exit()
+
+        with open(urls_file, 'r') as f:
+            urls_to_process = json.load(f)
+        working_proxies = load_proxies(proxies_file)
+
+        print(f"Worker #{worker_id} loaded {len(urls_to_process)} URLs and {len(working_proxies)} proxies.")
+
+        # Skip URLs already scraped in an earlier run
+        urls_to_do = checkpoints.remaining(urls_to_process)
+        total = len(urls_to_do)
+        url_batches = [urls_to_do]
+
+    # Items the backend already has cost little to send: /items/bulk answers "existing" without writing them.
+    item_buffer = ItemBuffer(on_saved=mark_urls_scraped, on_failed=mark_urls_conflicting)
+    if args.skip_known_urls:
+        known_urls = fetch_known_filter("item_url")
+        if known_urls is not None:
+            url_batches = skip_known_urls(url_batches, known_urls, mark_urls_scraped)
+    # Proxy stats are shared between runs (and workers) through proxy_pool_state.json.
+    proxy_pool = ProxyPool(working_proxies)
+
+    def flushed_urls():
+        # Flush after each batch so leased URLs are saved (and completed) well before their lease expires.
+        for batch in url_batches:
+            yield from batch
+            item_buffer.flush()
+
+    try:
+        if args.engine == "async":
+            asyncio.run(run_worker_async(worker_id, url_batches, total, proxy_pool, item_buffer, args.concurrency, handle_failed, args.block_profile))
+        else:
+            run_worker_sync(worker_id, flushed_urls(), total, proxy_pool, item_buffer, args.fetch_mode, handle_failed, args.block_profile)
 
-        if browser and browser.is_connected(): browser.close()
+        if not item_buffer.flush(force=True):
+            print(f"❌ [Worker #{worker_id}] Could not save the last {len(item_buffer.pending)} items. They will be re-scraped on the next run.")
+    finally:
+        proxy_pool.save()
+        checkpoints.close()
+        if queue:
+            queue.release(worker_id)
+            queue.close()
+    transfer_stats = format_transfer_stats()
+    if transfer_stats:
+        print(f"[Worker #{worker_id}] Browser traffic by blocking profile:\n{transfer_stats}")
     print(f"\n--- ✅ Worker #{worker_id} finished. ---")
\ No newline at end of file
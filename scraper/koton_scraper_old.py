@@ -9,6 +9,7 @@ import datetime
 from pathlib import Path
 from bs4 import BeautifulSoup
 from playwright.sync_api import sync_playwright, Page, TimeoutError as PlaywrightTimeoutError
+from category_crawler import CATEGORIES_TO_SCRAPE
 
 API_URL = "http://127.0.0.1:8000"
 USER_DATA_DIR = Path(__file__).parent / "browser_data"
@@ -17,20 +18,6 @@ SCRAPED_URLS_FILE = Path(__file__).parent / "scraped_urls.json"
 PERMANENTLY_FAILED_URLS_FILE = Path(__file__).parent / "permanently_failed_urls.txt"
 WORKING_PROXIES_LIST_FILE = Path(__file__).parent / "working_proxies_list.txt"
 
-CATEGORIES_TO_SCRAPE = [
-    "https://www.koton.com/kadin-giyim/", "https://www.koton.com/kadin-koton-jeans/",
-    "https://www.koton.com/sezon-trendleri", "https://www.koton.com/kadin-abiye-davet/",
-    "https://www.koton.com/kadin-ic-giyim/", "https://www.koton.com/sportclub/",
-    "https://www.koton.com/kadin-ofis-stili/", "https://www.koton.com/kadin-aksesuar/",
-    "https://www.koton.com/genc-kadin-yeni-gelenler/", "https://www.koton.com/genc-kadin-cok-satanlar/",
-    "https://www.koton.com/genc-kadin-giyim/", "https://www.koton.com/coklu-paket-urunler-kadin/",
-    "https://www.koton.com/erkek-yeni-gelenler/", "https://www.koton.com/erkek-giyim/",
-    "https://www.koton.com/erkek-koton-jeans/", "https://www.koton.com/erkek-anasayfa",
-    "https://www.koton.com/erkek-pijama-ev-ve-ic-giyim/", "https://www.koton.com/erkek-spor-giyim/",
-    "https://www.koton.com/erkek-aksesuar/", "https://www.koton.com/indirim-anasayfa",
-    "https://www.koton.com/yuzde50-indirimli-urunler/",
-]
-
 def save_item_to_db(item_data: dict) -> bool:
     try:
         serial_code = item_data.get("serial_code")
@@ -1,9 +1,10 @@
 # scraper/main_scraper.py
 
 import requests
-import random
+import time
 from pathlib import Path
 from bs4 import BeautifulSoup # We'll need this for parsing later
+from proxy_pool import ProxyPool
 
 # --- File Definitions ---
 # This file is generated by proxy_tester.py
@@ -22,42 +23,44 @@ def load_working_proxies(filepath: Path) -> list:
     print(f"✅ Loaded {len(proxies)} working proxies from the list.")
     return proxies
 
-def make_request_with_proxy(url: str, proxies_list: list, max_retries: int = 5):
+def make_request_with_proxy(url: str, proxy_pool: ProxyPool, max_retries: int = 5):
     """
-    Makes a request to a URL using a random proxy from the list.
-    If a proxy fails, it's removed from the list and another is tried, up to max_retries.
+    Makes a request to a URL using a proxy picked from the pool by score.
+    If a proxy fails, it's quarantined for a while and another is tried, up to max_retries.
     """
-    if not proxies_list:
-        print("Proxy list is empty. Cannot make a request.")
+    if not len(proxy_pool):
+        print("Proxy pool is empty. Cannot make a request.")
         return None
 
     retries = 0
-    while retries < max_retries and proxies_list:
+    while retries < max_retries:
+        # 1. Pick the best-scoring live proxy (weighted random, so slower proxies still get some traffic)
+        proxy = proxy_pool.acquire()
+        if proxy is None:
+            print("All proxies are quarantined.")
+            break
         try:
-            # 1. Randomly choose a proxy from our working list
-            proxy = random.choice(proxies_list)
             print(f"[*] Attempting request with proxy: {proxy} ({retries + 1}/{max_retries})")
 
             # 2. Set up the proxies dictionary for the request
             proxies_dict = {"http": proxy, "https": proxy}
             
             # 3. Make the request
+            start_time = time.monotonic()
             response = requests.get(url, proxies=proxies_dict, timeout=15)
             
             # 4. If the request was not successful, raise an exception to trigger the retry logic
             response.raise_for_status() # Raises HTTPError for bad responses (4xx or 5xx)
             
+            proxy_pool.report_success(proxy, time.monotonic() - start_time)
             print(f"✅ Successfully fetched URL: {url}")
             return response # Success! Return the response object.
 
         except requests.exceptions.RequestException as e:
-            print(f"❌ Proxy {proxy} failed. Error: {e.__class__.__name__}. Removing from list.")
-            # Remove the failing proxy so we don't use it again in this run
-            proxies_list.remove(proxy)
+            print(f"❌ Proxy {proxy} failed. Error: {e.__class__.__name__}. Quarantining it.")
+            # The proxy is benched for a while instead of being dropped for good
+            proxy_pool.report_failure(proxy)
             retries += 1
-            if not proxies_list:
-                print("All proxies have failed.")
-                break
     
     print(f"Failed to fetch URL after {max_retries} retries.")
     return None
@@ -76,7 +79,9 @@ if __name__ == "__main__":
     TARGET_URL = "http://quotes.toscrape.com/"
 
     # 3. Make the request using our robust proxy-rotating function
-    page_response = make_request_with_proxy(TARGET_URL, working_proxies)
+    proxy_pool = ProxyPool(working_proxies)
+    page_response = make_request_with_proxy(TARGET_URL, proxy_pool)
+    proxy_pool.save()
 
     # 4. Process the response if it was successful
     if page_response:
@@ -1,42 +1,75 @@
 # scraper/price_updater.py
 
 import requests
-import time
-import random
 import re
-from playwright.sync_api import sync_playwright, Page
-
-API_URL = "http://127.0.0.1:8000"
+import argparse
+import itertools
+from playwright.sync_api import sync_playwright, Page, TimeoutError as PlaywrightTimeoutError
+from api_client import API_URL, PriceBuffer, iter_items
+from browser_pool import BrowserPool
+from conditional_fetch import ConditionalPriceChecker, PriceCheckStore
+from http_fetch import HttpFetcher
+from rate_limiter import RateLimiter
+from refresh_scheduler import CheckFailures, RefreshScheduler, SaleListings
+from resource_blocking import BLOCKING_PROFILES, DEFAULT_PROFILE, PRICE_READY_SELECTOR, format_transfer_stats
 
 def get_all_items_from_db():
-    """Fetches all items from our API."""
+    """Yields all items from our API, fetching them page by page."""
     try:
-        response = requests.get(f"{API_URL}/items/")
-        if response.status_code == 200:
-            print(f"Successfully fetched {len(response.json())} items from the database.")
-            return response.json()
-        else:
-            print("Failed to fetch items from API.")
-            return []
+        yield from iter_items()
     except requests.exceptions.ConnectionError:
         print("❌ Could not connect to the backend API. Is the uvicorn server running?")
-        return None
+    except requests.exceptions.HTTPError as e:
+        print(f"Failed to fetch items from API. Error: {e}")
+
+def get_due_items_from_db(budget: int = None):
+    """Yields the items whose price is due for a check, most overdue first, at most `budget` of them."""
+    sale_listings, check_failures = SaleListings(), CheckFailures()
+    try:
+        scheduler = RefreshScheduler.load(sale_listings, check_failures)
+    except requests.exceptions.ConnectionError:
+        print("❌ Could not connect to the backend API. Is the uvicorn server running?")
+        return
+    except requests.exceptions.HTTPError as e:
+        print(f"Failed to fetch items from API. Error: {e}")
+        return
+    finally:
+        sale_listings.close()
+        check_failures.close()
+    due = scheduler.due_count()
+    print(f"{due} of {len(scheduler)} items are due for a price check"
+          + (f"; checking the {budget} most overdue." if budget is not None and budget < due else "."))
+    yield from scheduler.due_items(limit=budget)
+
+def scrape_and_update_price(page: Page, item: dict, price_buffer: PriceBuffer = None, limiter: RateLimiter = None) -> bool:
+    """Visits an item's URL, scrapes its current price, and saves it to the DB. Returns True on success.
 
-def scrape_and_update_price(page: Page, item: dict):
-    """Visits an item's URL, scrapes its current price, and saves it to the DB."""
+    With a price_buffer the price is queued for a batch write instead of being posted right away.
+    With a limiter the visit is paced for the item's host.
+    """
     item_id = item['id']
     url = item['item_url']
     
     try:
         print(f"-> Checking price for: {item['name'][:50]}...")
-        page.goto(url, wait_until="domcontentloaded", timeout=60000)
+        if limiter:
+            limiter.wait(url)
+        # Resolve as soon as the price element is rendered instead of waiting for the whole page
+        page.goto(url, wait_until="commit", timeout=60000)
+        page.wait_for_selector(PRICE_READY_SELECTOR, timeout=60000)
+        if limiter:
+            limiter.record(url)
 
         # Scrape just the price
-        price_container_selector = "div.price__price"
-        price_text = page.locator(price_container_selector).inner_text()
+        price_text = page.locator(PRICE_READY_SELECTOR).inner_text()
         price_clean = re.sub(r'[^\d,]', '', price_text).replace(',', '.')
         current_price = float(price_clean)
 
+        if price_buffer is not None:
+            print(f"-> Queued price: {current_price} TL")
+            price_buffer.add(item_id, current_price)
+            return True
+
         # Prepare data for the API
         price_payload = {"price": current_price}
 
@@ -44,25 +77,105 @@ def scrape_and_update_price(page: Page, item: dict):
         response = requests.post(f"{API_URL}/items/{item_id}/prices/", json=price_payload)
         if response.status_code == 200:
             print(f"✅ Logged new price: {current_price} TL")
-        else:
-            print(f"❌ Failed to log price. API Status: {response.status_code}, Response: {response.json()}")
+            return True
+        print(f"❌ Failed to log price. API Status: {response.status_code}, Response: {response.json()}")
 
     except Exception as e:
+        # Covers the CAPTCHA page too, which never renders the price.
+        if limiter and isinstance(e, PlaywrightTimeoutError):
+            limiter.record(url, throttled=True)
         print(f"❌ Could not scrape price for {url}. Error: {e}")
+    return False
+
+def check_price_http(checker: ConditionalPriceChecker, item: dict, price_buffer: PriceBuffer,
+                     confirm_buffer: PriceBuffer, limiter: RateLimiter) -> bool:
+    """Checks an item's price without a browser. Returns False if the page needs the browser instead.
+
+    Unchanged prices go to `confirm_buffer` (a dedupe buffer), so they count as observed without adding rows.
+    """
+    url = item['item_url']
+    print(f"-> Checking price for: {item['name'][:50]}...")
+    limiter.wait(url)
+    try:
+        check = checker.check(item)
+    except requests.exceptions.RequestException as e:
+        print(f"❌ HTTP check failed for {url}. Error: {e.__class__.__name__}")
+        return False
+    if check.needs_browser:
+        return False
+    if check.unchanged:
+        print(f"-> Unchanged: {check.price} TL")
+        confirm_buffer.add(item['id'], check.price)
+        return True
+    print(f"-> Queued price: {check.price} TL")
+    price_buffer.add(item['id'], check.price)
+    return True
 
 if __name__ == "__main__":
-    items_to_track = get_all_items_from_db()
+    parser = argparse.ArgumentParser(description="Refreshes the price of every tracked item.")
+    parser.add_argument("--block-profile", choices=sorted(BLOCKING_PROFILES), default=DEFAULT_PROFILE,
+                        help="Which images/fonts/trackers the browser skips downloading.")
+    parser.add_argument("--fetch-mode", choices=["browser", "http"], default="browser",
+                        help="'http' checks prices with conditional requests and only falls back to the browser for CAPTCHA/JS-gated pages.")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="Store a price only when it changed; unchanged prices just confirm the latest row.")
+    parser.add_argument("--scheduled", action="store_true",
+                        help="Only check items whose price is due, by how often it changes (see refresh_scheduler.py).")
+    parser.add_argument("--budget", type=int, default=None,
+                        help="With --scheduled, check at most this many items in this run.")
+    args = parser.parse_args()
+
+    if args.scheduled:
+        items_to_track = get_due_items_from_db(args.budget)
+    else:
+        items_to_track = get_all_items_from_db()
+    # Peek at the first item so no browser is started when the API is down or empty.
+    first_item = next(items_to_track, None)
 
-    if items_to_track:
+    if first_item:
         with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
+            # The updater does not use proxies; the pool just keeps the browser alive and recycles its context.
+            browser_pool = BrowserPool(p, proxied=False, block_profile=args.block_profile)
+            # Paces the visits instead of a fixed pause: faster while Koton answers normally, slower when it pushes back.
+            limiter = RateLimiter()
+            # Failed checks push the item back in the schedule (see refresh_scheduler.py).
+            check_failures = CheckFailures()
+            checker = None
+            if args.fetch_mode == "http":
+                # The browser is only started once a page needs it.
+                checker = ConditionalPriceChecker(HttpFetcher(limiter=limiter), PriceCheckStore())
+                page = None
+            else:
+                page = browser_pool.open()
+            # A check's state is only stored once its price was accepted, so a failed post is retried in full next run.
+            on_saved = checker.commit if checker else None
+            price_buffer = PriceBuffer(dedupe=args.dedupe, on_saved=on_saved)
+            # Unchanged pages only confirm the latest row, which keeps the item counted as observed.
+            confirm_buffer = price_buffer if args.dedupe else PriceBuffer(dedupe=True, on_saved=on_saved)
 
-            print(f"\nStarting price update for {len(items_to_track)} items...")
-            for i, item in enumerate(items_to_track, 1):
-                print(f"--- Processing {i}/{len(items_to_track)} ---")
-                scrape_and_update_price(page, item)
-                time.sleep(random.uniform(3, 7)) # Be respectful and slow down
+            print("\nStarting price update for all items...")
+            for i, item in enumerate(itertools.chain([first_item], items_to_track), 1):
+                print(f"--- Processing item {i} ---")
+                if checker:
+                    if check_price_http(checker, item, price_buffer, confirm_buffer, limiter):
+                        check_failures.record(item['id'], failed=False)
+                        continue
+                    print("🧭 Page needs a browser. Falling back to Playwright.")
+                    page = page or browser_pool.open()
+                checked = scrape_and_update_price(page, item, price_buffer, limiter)
+                check_failures.record(item['id'], failed=not checked)
+                page = browser_pool.page_done()
 
-            browser.close()
+            browser_pool.close()
+            check_failures.close()
+            buffers = [price_buffer] if confirm_buffer is price_buffer else [price_buffer, confirm_buffer]
+            for buffer in buffers:
+                if not buffer.flush(force=True):
+                    print(f"❌ Could not save the last {len(buffer.pending)} prices.")
+            if checker:
+                checker.fetcher.close()
+                checker.store.close()
+                print(f"Conditional requests: {checker.stats.summary()}")
+            print(f"Pacing: {limiter.summary()}")
+            print(f"Browser traffic by blocking profile:\n{format_transfer_stats()}")
             print("\nPrice update process finished.")
\ No newline at end of file
@@ -0,0 +1,120 @@
+# scraper/proxy_pool.py
+
+import json
+import math
+import os
+import random
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+# --- File Definitions ---
+PROXY_STATE_FILE = Path(__file__).parent / "proxy_pool_state.json"
+
+# --- Scoring Settings ---
+LATENCY_EWMA_ALPHA = 0.3     # Weight of the newest latency sample in the moving average.
+DEFAULT_LATENCY = 5.0        # Assumed latency (seconds) for proxies we have not measured yet.
+BASE_COOLDOWN = 30           # Seconds a proxy sits in quarantine after its first failure...
+MAX_COOLDOWN = 60 * 60       # ...doubling with every consecutive failure, up to this cap.
+
+class ProxyPool:
+    """Chooses proxies by a score built from success rate and latency.
+
+    A failing proxy is quarantined with an exponential backoff instead of being removed, and
+    comes back once its cooldown is over. Stats can be saved between runs.
+    """
+
+    def __init__(self, proxies: Iterable[str], state_file: Optional[Path] = PROXY_STATE_FILE):
+        self.state_file = state_file
+        self.stats = {proxy: self._new_stats() for proxy in proxies}
+        if state_file:
+            self.load()
+
+    @staticmethod
+    def _new_stats() -> dict:
+        return {"successes": 0, "failures": 0, "latency": None, "consecutive_failures": 0, "cooldown_until": 0.0}
+
+    # --- Selection ---
+    def score(self, proxy: str) -> float:
+        """Higher is better: smoothed success rate divided by the latency EWMA."""
+        s = self.stats[proxy]
+        success_rate = (s["successes"] + 1) / (s["successes"] + s["failures"] + 2)
+        latency = s["latency"] if s["latency"] is not None else DEFAULT_LATENCY
+        return success_rate / max(latency, 0.05)
+
+    def available(self) -> list:
+        now = time.time()
+        return [p for p, s in self.stats.items() if s["cooldown_until"] <= now]
+
+    def acquire(self, exclude: Iterable[str] = ()) -> Optional[str]:
+        """Picks a live proxy at random, weighted by score. Returns None if every proxy is quarantined."""
+        excluded = set(exclude)
+        candidates = [p for p in self.available() if p not in excluded]
+        if not candidates:
+            return None
+        weights = [self.score(p) for p in candidates]
+        return random.choices(candidates, weights=weights, k=1)[0]
+
+    def wait_time(self) -> float:
+        """Seconds until the next quarantined proxy comes back (0 if one is live now, inf if the pool is empty)."""
+        if not self.stats:
+            return math.inf
+        return max(0.0, min(s["cooldown_until"] for s in self.stats.values()) - time.time())
+
+    # --- Feedback ---
+    def report_success(self, proxy: str, latency: float):
+        s = self.stats.setdefault(proxy, self._new_stats())
+        s["successes"] += 1
+        s["consecutive_failures"] = 0
+        s["cooldown_until"] = 0.0
+        if s["latency"] is None:
+            s["latency"] = latency
+        else:
+            s["latency"] = LATENCY_EWMA_ALPHA * latency + (1 - LATENCY_EWMA_ALPHA) * s["latency"]
+
+    def report_failure(self, proxy: str):
+        """Quarantines the proxy; every consecutive failure doubles the cooldown."""
+        s = self.stats.setdefault(proxy, self._new_stats())
+        s["failures"] += 1
+        s["consecutive_failures"] += 1
+        cooldown = min(BASE_COOLDOWN * 2 ** (s["consecutive_failures"] - 1), MAX_COOLDOWN)
+        s["cooldown_until"] = time.time() + cooldown
+
+    def __len__(self):
+        return len(self.stats)
+
+    def summary(self) -> str:
+        live = len(self.available())
+        return f"{live}/{len(self.stats)} proxies live"
+
+    # --- Persistence ---
+    def load(self):
+        """Restores stats saved by an earlier run for the proxies in this pool."""
+        if not self.state_file or not self.state_file.exists():
+            return
+        try:
+            with open(self.state_file, 'r') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            print(f"❗ Could not read {self.state_file.name}. Starting with fresh proxy stats.")
+            return
+        for proxy in self.stats:
+            if proxy in saved:
+                self.stats[proxy].update(saved[proxy])
+
+    def save(self):
+        """Merges this pool's stats into the state file, keeping entries written by other workers."""
+        if not self.state_file:
+            return
+        saved = {}
+        if self.state_file.exists():
+            try:
+                with open(self.state_file, 'r') as f:
+                    saved = json.load(f)
+            except (OSError, ValueError):
+                saved = {}
+        saved.update(self.stats)
+        tmp_file = self.state_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_file, 'w') as f:
+            json.dump(saved, f)
+        os.replace(tmp_file, self.state_file)
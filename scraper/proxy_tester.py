@@ -1,7 +1,10 @@
 # scraper/proxy_tester.py
 
+import argparse
+import threading
+import time
 import requests
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 # --- File Definitions ---
@@ -14,6 +17,9 @@ TESTED_PROXIES_LOG_FILE = Path(__file__).parent / "tested_proxies.txt"
 PROXIFLY_URL = "https://raw.githubusercontent.com/proxifly/free-proxy-list/main/proxies/all/data.txt"
 
 TEST_URL = "http://httpbin.org/ip"
+DEFAULT_WORKERS = 50
+# Lines are written through the file buffers and flushed to disk every this many results.
+FLUSH_EVERY = 100
 SUCCESS_COUNT = 0
 FAIL_COUNT = 0
 SKIPPED_COUNT = 0
@@ -39,53 +45,92 @@ def fetch_proxifly_list(url: str) -> set:
         print(f"❌ FAILED to fetch proxy list from URL. Error: {e}")
         return set()
 
+def load_proxies_from_file(filepath: Path) -> set:
+    """Loads a set of proxies from a local file, one per line (e.g. to test offline)."""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return {line.strip() for line in f if line.strip()}
+
+# Each thread keeps its own session so connection pools and headers are set up once per thread, not per proxy.
+_thread_state = threading.local()
+
+def _session() -> requests.Session:
+    if not hasattr(_thread_state, "session"):
+        _thread_state.session = requests.Session()
+    return _thread_state.session
+
+def test_proxy(proxy: str, test_url: str, timeout: float):
+    """Tests one proxy. Returns (proxy, succeeded, seconds taken, detail)."""
+    # Note: We assume http for the protocol, which works for most proxy types with the requests library.
+    proxies_dict = {"http": f"http://{proxy}", "https": f"http://{proxy}"}
+    start_time = time.monotonic()
+    try:
+        response = _session().get(test_url, proxies=proxies_dict, timeout=timeout)
+        time_taken = time.monotonic() - start_time
+        if response.status_code != 200:
+            return proxy, False, time_taken, f"status code {response.status_code}"
+        try:
+            origin = response.json().get('origin')
+        except ValueError:
+            origin = None
+        return proxy, True, time_taken, origin
+    except Exception as e:
+        return proxy, False, time.monotonic() - start_time, e.__class__.__name__
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tests proxies and saves the working ones.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="How many proxies are tested at the same time (1 tests them one by one).")
+    parser.add_argument("--test-url", default=TEST_URL,
+                        help="Endpoint every proxy is tested against. Point it at a local server to benchmark offline.")
+    parser.add_argument("--proxy-file", type=Path, default=None,
+                        help="Test proxies from this file instead of downloading the Proxifly list.")
+    parser.add_argument("--timeout", type=float, default=10)
+    args = parser.parse_args()
+
     tested_proxies = load_tested_proxies(TESTED_PROXIES_LOG_FILE)
     print(f"Loaded {len(tested_proxies)} previously tested proxies to avoid re-testing.")
 
-    proxies_to_test = fetch_proxifly_list(PROXIFLY_URL)
+    if args.proxy_file:
+        proxies_to_test = load_proxies_from_file(args.proxy_file)
+    else:
+        proxies_to_test = fetch_proxifly_list(PROXIFLY_URL)
     if not proxies_to_test:
         print("Could not retrieve any proxies to test. Exiting.")
         exit()
 
-    print(f"--- Starting test for {len(proxies_to_test)} proxies from Proxifly ---")
+    source = args.proxy_file.name if args.proxy_file else "Proxifly"
+    print(f"--- Starting test for {len(proxies_to_test)} proxies from {source} ({args.workers} at a time) ---")
 
     new_proxies_to_test = [p for p in proxies_to_test if p not in tested_proxies]
     SKIPPED_COUNT = len(proxies_to_test) - len(new_proxies_to_test)
     if SKIPPED_COUNT > 0:
         print(f"Skipping {SKIPPED_COUNT} already tested proxies.")
 
-    for proxy in new_proxies_to_test:
-        print(f"\n[*] Testing new proxy: {proxy}")
-        # Note: We assume http for the protocol, which works for most proxy types with the requests library.
-        proxies_dict = {"http": f"http://{proxy}", "https": f"http://{proxy}"}
-
-        try:
-            start_time = datetime.now()
-            response = requests.get(TEST_URL, proxies=proxies_dict, timeout=10)
-            end_time = datetime.now()
-            
-            if response.status_code == 200:
-                time_taken = (end_time - start_time).total_seconds()
-                report_line = f"{proxy} - SUCCESS in {time_taken:.2f} seconds. Site sees IP: {response.json().get('origin')}"
+    run_start = time.monotonic()
+    # The output files are opened once and results are streamed into them as they complete.
+    with open(WORKING_PROXIES_REPORT_FILE, 'a', encoding='utf-8') as report_file, \
+         open(WORKING_PROXIES_LIST_FILE, 'a', encoding='utf-8') as list_file, \
+         open(TESTED_PROXIES_LOG_FILE, 'a', encoding='utf-8') as tested_file, \
+         ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = [executor.submit(test_proxy, proxy, args.test_url, args.timeout) for proxy in new_proxies_to_test]
+        for done, future in enumerate(as_completed(futures), 1):
+            proxy, succeeded, time_taken, detail = future.result()
+            if succeeded:
+                report_line = f"{proxy} - SUCCESS in {time_taken:.2f} seconds. Site sees IP: {detail}"
                 print(f"✅ {report_line}")
-                
-                with open(WORKING_PROXIES_REPORT_FILE, 'a', encoding='utf-8') as f:
-                    f.write(report_line + "\n")
-                with open(WORKING_PROXIES_LIST_FILE, 'a', encoding='utf-8') as f:
-                    f.write(proxy + "\n")
-                
+                report_file.write(report_line + "\n")
+                list_file.write(proxy + "\n")
                 SUCCESS_COUNT += 1
             else:
-                print(f"❌ FAILED with status code: {response.status_code}")
+                print(f"❌ {proxy} FAILED with {detail}")
                 FAIL_COUNT += 1
+            tested_file.write(proxy + "\n")
 
-        except Exception as e:
-            print(f"❌ FAILED with error: {e.__class__.__name__}")
-            FAIL_COUNT += 1
-        
-        with open(TESTED_PROXIES_LOG_FILE, 'a', encoding='utf-8') as f:
-            f.write(proxy + "\n")
+            if done % FLUSH_EVERY == 0:
+                for f in (report_file, list_file, tested_file):
+                    f.flush()
+                print(f"--- Progress: {done}/{len(futures)} tested, {SUCCESS_COUNT} working ---")
+    elapsed = time.monotonic() - run_start
 
     print("\n" + "="*30)
     print("--- TEST COMPLETE ---")
@@ -96,5 +141,6 @@ if __name__ == "__main__":
     if (SUCCESS_COUNT + FAIL_COUNT) > 0:
         success_rate = (SUCCESS_COUNT / (SUCCESS_COUNT + FAIL_COUNT)) * 100
         print(f"Success Rate on New Proxies: {success_rate:.1f}%")
+        print(f"Total Time: {elapsed:.1f}s ({(SUCCESS_COUNT + FAIL_COUNT) / elapsed:.1f} proxies/s)")
     print("="*30)
     print(f"Working proxies have been saved to '{WORKING_PROXIES_LIST_FILE.name}'")
\ No newline at end of file
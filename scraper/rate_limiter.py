@@ -0,0 +1,111 @@
+# scraper/rate_limiter.py
+
+"""Adaptive request pacing per target host and per proxy, in place of fixed random sleeps.
+
+Every host and every proxy (or the direct connection) has a token bucket. Each healthy response
+raises its rate by a small step (additive increase); a 403/429, a CAPTCHA page or a timeout halves
+it and empties the bucket (multiplicative decrease). A request waits for both its host's and its
+proxy's bucket. Buckets live in one process, so separate worker processes pace themselves independently.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+# --- Pacing Settings ---
+# Requests per second to start at, never go below / above, and to add per healthy response; bucket size.
+HOST_PACING = {"rate": 2.0, "min_rate": 0.2, "max_rate": 20.0, "increase": 0.1, "burst": 4}
+PROXY_PACING = {"rate": 0.5, "min_rate": 0.05, "max_rate": 2.0, "increase": 0.05, "burst": 2}
+# A bucket's rate is multiplied by this whenever the site pushes back.
+BACKOFF_FACTOR = 0.5
+# Waits are stretched by up to this fraction so workers do not fall into lockstep.
+JITTER = 0.2
+# Bucket key for requests that do not go through a proxy.
+DIRECT = "direct"
+
+class TokenBucket:
+    """Token bucket whose refill rate is tuned by AIMD feedback."""
+
+    def __init__(self, rate: float, min_rate: float, max_rate: float, increase: float, burst: int):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.throttles = 0
+
+    def reserve(self, now: float) -> float:
+        """Takes a token, borrowing against the refill if none is left. Returns how long to wait for it."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def healthy(self):
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def throttled(self):
+        self.rate = max(self.min_rate, self.rate * BACKOFF_FACTOR)
+        # No burst right after a push back.
+        self.tokens = min(self.tokens, 0.0)
+        self.throttles += 1
+
+class RateLimiter:
+    """Paces requests through one token bucket per target host and one per proxy."""
+
+    def __init__(self, host_pacing: dict = HOST_PACING, proxy_pacing: dict = PROXY_PACING):
+        self.host_pacing = host_pacing
+        self.proxy_pacing = proxy_pacing
+        self.hosts = {}
+        self.proxies = {}
+        self.waited = 0.0
+        self.lock = threading.Lock()
+
+    def _buckets(self, url: str, proxy: Optional[str]) -> tuple:
+        host, proxy = urlparse(url).netloc, proxy or DIRECT
+        if host not in self.hosts:
+            self.hosts[host] = TokenBucket(**self.host_pacing)
+        if proxy not in self.proxies:
+            self.proxies[proxy] = TokenBucket(**self.proxy_pacing)
+        return self.hosts[host], self.proxies[proxy]
+
+    def reserve(self, url: str, proxy: Optional[str] = None) -> float:
+        """Books the next request to `url` through `proxy`. Returns the seconds to wait before sending it."""
+        with self.lock:
+            now = time.monotonic()
+            delay = max(bucket.reserve(now) for bucket in self._buckets(url, proxy))
+            delay *= random.uniform(1, 1 + JITTER)
+            self.waited += delay
+        return delay
+
+    def wait(self, url: str, proxy: Optional[str] = None):
+        delay = self.reserve(url, proxy)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, url: str, proxy: Optional[str] = None):
+        delay = self.reserve(url, proxy)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record(self, url: str, proxy: Optional[str] = None, throttled: bool = False):
+        """Feeds a request's outcome back: throttled for a 403/429, a CAPTCHA or a timeout."""
+        with self.lock:
+            for bucket in self._buckets(url, proxy):
+                if throttled:
+                    bucket.throttled()
+                else:
+                    bucket.healthy()
+
+    def summary(self) -> str:
+        with self.lock:
+            hosts = ", ".join(f"{host} {bucket.rate:.2f}/s ({bucket.throttles} throttled)"
+                              for host, bucket in self.hosts.items())
+            rates = [bucket.rate for bucket in self.proxies.values()]
+            proxies = f"{len(rates)} proxies at {sum(rates) / len(rates):.2f}/s on average" if rates else "no proxies"
+            return f"{hosts or 'no hosts'}; {proxies}; {self.waited:.0f}s spent waiting"
@@ -0,0 +1,172 @@
+# scraper/refresh_scheduler.py
+
+"""Decides which items the price updater checks next, from how often their price moves.
+
+Every item gets a due time from its price summary (GET /prices/summary):
+
+- It is checked again after as long as its price has already been stable, kept within
+  MIN_INTERVAL..MAX_INTERVAL. Every unchanged check therefore doubles the wait, and the first
+  check after a change comes MIN_INTERVAL later.
+- Items whose price moved in the last 30 days are checked at least every VOLATILE_INTERVAL.
+- Items category_crawler.py saw in a sale category recently wait SALE_BOOST times less.
+- Items without a recorded price are due right away, behind the items that are already overdue.
+- After a failed check an item waits MIN_INTERVAL, doubled per consecutive failure up to
+  MAX_INTERVAL; after MAX_FAILED_ATTEMPTS failures it is only retried every MAX_INTERVAL.
+
+`price_updater.py --scheduled` then checks the due items, most overdue first.
+"""
+
+import heapq
+import itertools
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from api_client import iter_items, iter_price_summaries
+
+# --- File Definitions ---
+SALE_LISTINGS_FILE = Path(__file__).parent / "sale_listings.db"
+CHECK_FAILURES_FILE = Path(__file__).parent / "check_failures.db"
+
+# --- Scheduling Settings ---
+MIN_INTERVAL = timedelta(hours=6)
+MAX_INTERVAL = timedelta(days=14)
+VOLATILE_INTERVAL = timedelta(days=1)
+SALE_BOOST = 4
+# How long after the crawler last saw an item in a sale listing it still counts as on sale.
+SALE_LISTING_MAX_AGE = timedelta(days=3)
+# Category listings whose products get the sale boost.
+SALE_CATEGORIES = ("https://www.koton.com/indirim-anasayfa", "https://www.koton.com/yuzde50-indirimli-urunler/")
+# Consecutive failed checks after which an item is only retried every MAX_INTERVAL.
+MAX_FAILED_ATTEMPTS = 5
+
+class SaleListings:
+    """Product URLs seen in the sale categories and when they were last seen, in a local SQLite file."""
+
+    def __init__(self, path: Path = SALE_LISTINGS_FILE):
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS sale_urls (url TEXT PRIMARY KEY, seen_at REAL NOT NULL)")
+
+    def mark(self, urls: list):
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.executemany("""
+            INSERT INTO sale_urls (url, seen_at) VALUES (?, ?)
+            ON CONFLICT (url) DO UPDATE SET seen_at = excluded.seen_at
+        """, ((url, now) for url in urls))
+        self.conn.execute("COMMIT")
+
+    def recent(self, max_age: timedelta = SALE_LISTING_MAX_AGE) -> set:
+        rows = self.conn.execute("SELECT url FROM sale_urls WHERE seen_at >= ?", (time.time() - max_age.total_seconds(),))
+        return {url for (url,) in rows}
+
+    def close(self):
+        self.conn.close()
+
+class CheckFailures:
+    """Consecutive failed price checks per item and when the last one happened, in a local SQLite file."""
+
+    def __init__(self, path: Path = CHECK_FAILURES_FILE):
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS check_failures (
+                item_id INTEGER PRIMARY KEY,
+                failures INTEGER NOT NULL,
+                failed_at REAL NOT NULL
+            )
+        """)
+
+    def record(self, item_id: int, failed: bool):
+        if not failed:
+            self.conn.execute("DELETE FROM check_failures WHERE item_id = ?", (item_id,))
+            return
+        self.conn.execute("""
+            INSERT INTO check_failures (item_id, failures, failed_at) VALUES (?, 1, ?)
+            ON CONFLICT (item_id) DO UPDATE SET failures = failures + 1, failed_at = excluded.failed_at
+        """, (item_id, time.time()))
+
+    def all(self) -> dict:
+        """(failures, last failed at) per item id."""
+        rows = self.conn.execute("SELECT item_id, failures, failed_at FROM check_failures")
+        return {item_id: (failures, datetime.fromtimestamp(failed_at, timezone.utc)) for item_id, failures, failed_at in rows}
+
+    def close(self):
+        self.conn.close()
+
+def parse_timestamp(value: str) -> datetime:
+    timestamp = datetime.fromisoformat(value)
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+def refresh_interval(summary: dict, on_sale: bool = False) -> timedelta:
+    """How long after its last observation an item should be checked again."""
+    stable_for = parse_timestamp(summary["last_observed_at"]) - parse_timestamp(summary["last_change_at"])
+    interval = min(max(stable_for, MIN_INTERVAL), MAX_INTERVAL)
+    if summary.get("min_price_30d") != summary.get("max_price_30d"):
+        interval = min(interval, VOLATILE_INTERVAL)
+    if on_sale:
+        interval /= SALE_BOOST
+    return interval
+
+def retry_interval(failures: int) -> timedelta:
+    """How long after its last failed check an item is tried again."""
+    if failures >= MAX_FAILED_ATTEMPTS:
+        return MAX_INTERVAL
+    return min(MIN_INTERVAL * 2 ** (failures - 1), MAX_INTERVAL)
+
+def next_check_at(summary: Optional[dict], on_sale: bool = False, failure: Optional[tuple] = None,
+                  now: datetime = None) -> datetime:
+    """When an item is due, from its price summary and its (failures, last failed at), if any."""
+    if summary is None:
+        due = now or datetime.now(timezone.utc)
+    else:
+        due = parse_timestamp(summary["last_observed_at"]) + refresh_interval(summary, on_sale)
+    if failure is not None:
+        failures, failed_at = failure
+        due = max(due, failed_at + retry_interval(failures))
+    return due
+
+class RefreshScheduler:
+    """Priority queue of items ordered by when their price is due to be checked."""
+
+    def __init__(self):
+        self.heap = []
+        # Tie-breaker, so items with the same due time never get compared.
+        self._order = itertools.count()
+
+    def add(self, item: dict, summary: Optional[dict] = None, on_sale: bool = False,
+            failure: Optional[tuple] = None, now: datetime = None):
+        heapq.heappush(self.heap, (next_check_at(summary, on_sale, failure, now), next(self._order), item))
+
+    def __len__(self):
+        return len(self.heap)
+
+    def due_count(self, now: datetime = None) -> int:
+        now = now or datetime.now(timezone.utc)
+        return sum(1 for due, _, _ in self.heap if due <= now)
+
+    def next_due(self) -> Optional[datetime]:
+        return self.heap[0][0] if self.heap else None
+
+    def due_items(self, now: datetime = None, limit: int = None):
+        """Pops and yields the items due by `now`, most overdue first, at most `limit` of them."""
+        now = now or datetime.now(timezone.utc)
+        for _ in range(limit) if limit is not None else itertools.count():
+            if not self.heap or self.heap[0][0] > now:
+                return
+            yield heapq.heappop(self.heap)[2]
+
+    @classmethod
+    def load(cls, sale_listings: SaleListings = None, check_failures: CheckFailures = None) -> "RefreshScheduler":
+        """Schedules every item from the API. Raises requests exceptions if the API is unreachable."""
+        summaries = {summary["item_id"]: summary for summary in iter_price_summaries()}
+        on_sale = sale_listings.recent() if sale_listings else set()
+        failures = check_failures.all() if check_failures else {}
+        now = datetime.now(timezone.utc)
+        scheduler = cls()
+        for item in iter_items():
+            scheduler.add(item, summaries.get(item["id"]), item["item_url"] in on_sale, failures.get(item["id"]), now)
+        return scheduler
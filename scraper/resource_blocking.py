@@ -0,0 +1,103 @@
+# scraper/resource_blocking.py
+
+from urllib.parse import urlparse
+
+# --- Blocking Profiles ---
+# Resource types (as reported by Playwright) that each profile aborts, and whether trackers are blocked.
+BLOCKING_PROFILES = {
+    "off": {"resource_types": set(), "block_trackers": False},
+    "lean": {"resource_types": {"image", "media", "font"}, "block_trackers": True},
+    "strict": {"resource_types": {"image", "media", "font", "stylesheet", "manifest", "other"}, "block_trackers": True},
+}
+DEFAULT_PROFILE = "lean"
+
+# Analytics, ad and tag-manager hosts Koton pages load; none of them matter for the data we read.
+TRACKER_HOST_MARKERS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googleadservices.com",
+    "facebook.net", "facebook.com", "hotjar.com", "clarity.ms", "criteo.", "useinsider.com",
+    "tiktok.com", "yandex.", "bing.com", "pinterest.com", "adjust.com", "segment.io",
+)
+
+# --- Wait Targets ---
+# Navigations resolve as soon as these are in the DOM instead of waiting for network idle.
+PRODUCT_READY_SELECTOR = "div.js-ga4-product"  # Rendered after the JSON-LD script in <head>.
+PRICE_READY_SELECTOR = "div.price__price"
+CATEGORY_READY_SELECTOR = "a.product-link"
+
+class TransferStats:
+    """Counts finished requests, blocked requests and bytes received for one profile."""
+
+    def __init__(self):
+        self.requests = 0
+        self.blocked = 0
+        self.bytes_received = 0
+
+    def __str__(self):
+        return f"{self.requests} requests, {self.blocked} blocked, {self.bytes_received / (1024 * 1024):.1f} MB received"
+
+# One set of counters per profile name, shared by every context that uses the profile.
+TRANSFER_STATS = {name: TransferStats() for name in BLOCKING_PROFILES}
+
+def _is_tracker(url: str) -> bool:
+    host = urlparse(url).netloc
+    return any(marker in host for marker in TRACKER_HOST_MARKERS)
+
+def should_block(profile_name: str, resource_type: str, url: str) -> bool:
+    profile = BLOCKING_PROFILES[profile_name]
+    if resource_type in profile["resource_types"]:
+        return True
+    return profile["block_trackers"] and _is_tracker(url)
+
+def _response_bytes(request) -> int:
+    try:
+        sizes = request.sizes()
+        return max(sizes["responseBodySize"], 0) + max(sizes["responseHeadersSize"], 0)
+    except Exception:
+        return 0
+
+def install_blocking(context, profile_name: str = DEFAULT_PROFILE):
+    """Installs the profile's route interception and byte counters on a sync Playwright context."""
+    stats = TRANSFER_STATS[profile_name]
+
+    def handle_route(route):
+        request = route.request
+        if should_block(profile_name, request.resource_type, request.url):
+            stats.blocked += 1
+            route.abort()
+        else:
+            route.continue_()
+
+    def count_bytes(request):
+        stats.requests += 1
+        stats.bytes_received += _response_bytes(request)
+
+    if profile_name != "off":
+        context.route("**/*", handle_route)
+    context.on("requestfinished", count_bytes)
+
+async def install_blocking_async(context, profile_name: str = DEFAULT_PROFILE):
+    """Async Playwright version of install_blocking."""
+    stats = TRANSFER_STATS[profile_name]
+
+    async def handle_route(route):
+        request = route.request
+        if should_block(profile_name, request.resource_type, request.url):
+            stats.blocked += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def count_bytes(request):
+        stats.requests += 1
+        try:
+            sizes = await request.sizes()
+            stats.bytes_received += max(sizes["responseBodySize"], 0) + max(sizes["responseHeadersSize"], 0)
+        except Exception:
+            pass
+
+    if profile_name != "off":
+        await context.route("**/*", handle_route)
+    context.on("requestfinished", count_bytes)
+
+def format_transfer_stats() -> str:
+    return "\n".join(f"  {name}: {stats}" for name, stats in TRANSFER_STATS.items() if stats.requests or stats.bytes_received)
@@ -3,10 +3,16 @@
 import subprocess
 import os
 import sys # Import the sys module to check the operating system
+import argparse
 
-# This must match the TOTAL_WORKERS in dispatcher.py
+# This must match the TOTAL_WORKERS in dispatcher.py (not needed with --queue, where any number of workers can run)
 TOTAL_WORKERS = 6
 
+parser = argparse.ArgumentParser(description="Launches several koton_scraper.py workers.")
+parser.add_argument("--workers", type=int, default=TOTAL_WORKERS,
+                    help="How many workers to launch. With --queue this can differ from the dispatcher's count.")
+args, worker_args = parser.parse_known_args()
+
 # --- NEW: Cross-platform path to Python executable ---
 # Get the directory of the current script
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -23,9 +29,10 @@ script_path = os.path.join(script_dir, "koton_scraper.py")
 
 
 processes = []
-for i in range(TOTAL_WORKERS):
+for i in range(args.workers):
     print(f"--- Launching Worker #{i} ---")
-    command = [python_executable, script_path, str(i)]
+    # Any extra arguments (e.g. --fetch-mode http, --queue) are passed through to every worker.
+    command = [python_executable, script_path, str(i)] + worker_args
     
     # Check if the python executable exists before trying to run it
     if not os.path.exists(python_executable):
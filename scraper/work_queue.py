@@ -0,0 +1,116 @@
+# scraper/work_queue.py
+
+import sqlite3
+import time
+from pathlib import Path
+
+# --- File Definitions ---
+WORK_QUEUE_FILE = Path(__file__).parent / "work_queue.db"
+
+# --- Queue Settings ---
+# A leased URL goes back to the pool if its worker has not finished it within this many seconds.
+LEASE_SECONDS = 600
+# A URL that failed this many leases is marked as failed for good.
+MAX_ATTEMPTS = 3
+
+class WorkQueue:
+    """A shared URL queue in a local SQLite file.
+
+    Workers lease small batches of URLs; a lease that is not completed before it expires
+    (e.g. because the worker crashed) makes the URLs available to other workers again.
+    """
+
+    def __init__(self, path: Path = WORK_QUEUE_FILE):
+        # isolation_level=None lets us control transactions with explicit BEGIN IMMEDIATE.
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                url TEXT PRIMARY KEY,
+                state TEXT NOT NULL DEFAULT 'pending',
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_state_lease ON jobs (state, lease_expires_at)")
+
+    def seed(self, urls, state: str = "pending") -> int:
+        """Adds URLs that are not in the queue yet. Returns how many were new."""
+        before = self.conn.total_changes
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.executemany("INSERT OR IGNORE INTO jobs (url, state) VALUES (?, ?)", ((url, state) for url in urls))
+        self.conn.execute("COMMIT")
+        return self.conn.total_changes - before
+
+    def known(self, urls) -> set:
+        """Returns the URLs that are already in the queue, whatever their state."""
+        urls = list(urls)
+        known = set()
+        # Stays well below SQLite's limit on bound parameters.
+        for start in range(0, len(urls), 500):
+            chunk = urls[start:start + 500]
+            rows = self.conn.execute(f"SELECT url FROM jobs WHERE url IN ({', '.join('?' * len(chunk))})", chunk)
+            known.update(url for (url,) in rows)
+        return known
+
+    def lease(self, owner: str, batch_size: int = 25, lease_seconds: float = LEASE_SECONDS,
+              max_attempts: int = MAX_ATTEMPTS) -> list:
+        """Takes up to batch_size pending (or expired) URLs for this worker.
+
+        An expired lease that already used up max_attempts is marked failed instead: its URL
+        most likely crashed or hung every worker that took it.
+        """
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers can never lease the same rows.
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute("""
+                UPDATE jobs SET state = 'failed', lease_owner = NULL, lease_expires_at = NULL
+                WHERE state = 'leased' AND lease_expires_at < ? AND attempts >= ?
+            """, (now, max_attempts))
+            rows = self.conn.execute("""
+                SELECT url FROM jobs
+                WHERE state = 'pending' OR (state = 'leased' AND lease_expires_at < ?)
+                LIMIT ?
+            """, (now, batch_size)).fetchall()
+            urls = [url for (url,) in rows]
+            self.conn.executemany("""
+                UPDATE jobs SET state = 'leased', lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1
+                WHERE url = ?
+            """, ((owner, now + lease_seconds, url) for url in urls))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return urls
+
+    def complete(self, urls):
+        """Marks URLs as done."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.executemany("UPDATE jobs SET state = 'done', lease_owner = NULL WHERE url = ?", ((url,) for url in urls))
+        self.conn.execute("COMMIT")
+
+    def fail(self, url: str, max_attempts: int = MAX_ATTEMPTS) -> bool:
+        """Returns a URL to the pool, or marks it failed once it ran out of attempts. Returns True if it is failed for good."""
+        self.conn.execute("""
+            UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                            lease_owner = NULL, lease_expires_at = NULL
+            WHERE url = ?
+        """, (max_attempts, url))
+        (state,) = self.conn.execute("SELECT state FROM jobs WHERE url = ?", (url,)).fetchone()
+        return state == "failed"
+
+    def release(self, owner: str):
+        """Gives back every URL still leased by this worker, e.g. on a clean shutdown."""
+        self.conn.execute("""
+            UPDATE jobs SET state = 'pending', lease_owner = NULL, lease_expires_at = NULL,
+                            attempts = MAX(attempts - 1, 0)
+            WHERE state = 'leased' AND lease_owner = ?
+        """, (owner,))
+
+    def counts(self) -> dict:
+        return dict(self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+    def close(self):
+        self.conn.close()